@@ -0,0 +1,47 @@
+import random
+
+from maze_checks import path_length
+from maze_generators import generate_random_grid
+from maze_solvers import HEURISTICS, search, SolverWorkspace
+
+
+# Runs A* and BFS on the same seeded mazes, checks that every A* path is as
+# short as the BFS one and counts how many nodes each search expanded.
+def compare_astar(trials=2000, rows=30, cols=30, heuristic='manhattan', seed=0, open_probability=0.6):
+    h = HEURISTICS[heuristic]
+    picker = random.Random(seed)
+    report = {'heuristic': heuristic, 'trials': trials, 'solvable': 0, 'mismatches': [],
+              'bfs_expanded': 0, 'astar_expanded': 0}
+
+    for trial in range(trials):
+        grid = generate_random_grid(rows, cols, num_enemies=rows * cols // 40, num_rewards=0,
+                                    seed=seed + trial, open_probability=open_probability)
+        start, end = (picker.randint(0, rows - 1), 0), (picker.randint(0, rows - 1), cols - 1)
+        source, target = grid.index(*start), grid.index(*end)
+        if grid.is_enemy(source):
+            continue
+
+        workspace = SolverWorkspace(grid.size)
+        bfs_expanded, _ = search(grid, start, end, 'bfs', workspace=workspace)
+        expected = path_length(workspace, source, target, cols)
+        astar_expanded, _ = search(grid, start, end, 'astar', h, workspace=workspace)
+        found = path_length(workspace, source, target, cols)
+        if expected != found:
+            report['mismatches'].append((seed + trial, expected, found))
+        if expected is not None:
+            report['solvable'] += 1
+            report['bfs_expanded'] += bfs_expanded
+            report['astar_expanded'] += astar_expanded
+
+    if report['bfs_expanded']:
+        report['saved'] = 1 - report['astar_expanded'] / report['bfs_expanded']
+    return report
+
+
+if __name__ == "__main__":
+    for name in HEURISTICS:
+        result = compare_astar(heuristic=name)
+        print(name, "solvable:", result['solvable'], "of", result['trials'],
+              "wrong lengths:", len(result['mismatches']),
+              "expanded: %d vs bfs %d (%.1f%% fewer)" % (result['astar_expanded'], result['bfs_expanded'],
+                                                         100 * result.get('saved', 0)))
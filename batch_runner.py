@@ -0,0 +1,90 @@
+import argparse
+import csv
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from maze_components import pick_end, pick_start
+from maze_generators import GENERATORS, generate
+from maze_solvers import search
+
+FIELDS = ['seed', 'generator', 'rows', 'cols', 'solvable', 'path_length', 'path_length_after_enemies',
+          'nodes_expanded', 'seconds']
+
+
+def run_one(job):
+    # one seeded maze: generate, solve, drop enemies on the path, solve again
+    seed, generator, rows, cols, num_enemies, num_rewards, enemies_on_path = job
+    started = time.perf_counter()
+    grid = generate(generator, rows, cols, num_enemies=num_enemies, num_rewards=num_rewards, seed=seed)
+    picker = random.Random(seed)
+    result = {'seed': seed, 'generator': generator, 'rows': rows, 'cols': cols, 'solvable': False,
+              'path_length': None, 'path_length_after_enemies': None, 'nodes_expanded': 0}
+
+    start = pick_start(lambda row, col: grid.component(row * cols + col), rows, cols, picker)
+    if start is not None:
+        end = pick_end(lambda row, col: grid.component(row * cols + col), rows, cols, start, picker)
+        source, target = grid.index(*start), grid.index(*end)
+        expanded, workspace = search(grid, start, end)
+        result['nodes_expanded'] += expanded
+        if workspace.reached(target):
+            path = workspace.path(source, target, cols)
+            result['solvable'] = True
+            result['path_length'] = len(path)
+            for row, col in picker.sample(path[1:-1], min(enemies_on_path, len(path) - 2)):
+                grid.set_enemy(grid.index(row, col))
+            result['nodes_expanded'] += search(grid, start, end, workspace=workspace)[0]
+            if workspace.reached(target):
+                result['path_length_after_enemies'] = len(workspace.path(source, target, cols))
+
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+
+def run_batch(count, rows=40, cols=40, generator='random', num_enemies=35, num_rewards=45, enemies_on_path=2,
+              seed=0, workers=None, output='batch_results.jsonl'):
+    # The generator and solvers are imported once per worker process, not once
+    # per maze. Results are written in seed order as they come back.
+    jobs = [(seed + n, generator, rows, cols, num_enemies, num_rewards, enemies_on_path) for n in range(count)]
+    workers = workers or os.cpu_count()
+    chunksize = max(1, count // (workers * 8))
+    solvable = 0
+    with open(output, 'w', newline='') as out, ProcessPoolExecutor(workers) as pool:
+        if output.endswith('.csv'):
+            writer = csv.DictWriter(out, fieldnames=FIELDS)
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            write = lambda result: out.write(json.dumps(result) + "\n")
+        for result in pool.map(run_one, jobs, chunksize=chunksize):
+            solvable += result['solvable']
+            write(result)
+    return solvable
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and solve many seeded mazes on all cores.")
+    parser.add_argument('count', type=int)
+    parser.add_argument('--rows', type=int, default=40)
+    parser.add_argument('--cols', type=int, default=40)
+    parser.add_argument('--generator', choices=sorted(GENERATORS), default='random')
+    parser.add_argument('--enemies', type=int, default=35)
+    parser.add_argument('--rewards', type=int, default=45)
+    parser.add_argument('--enemies-on-path', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--output', default='batch_results.jsonl', help=".csv for CSV, JSON lines otherwise")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    solvable = run_batch(args.count, args.rows, args.cols, args.generator, args.enemies, args.rewards,
+                         args.enemies_on_path, args.seed, args.workers, args.output)
+    elapsed = time.perf_counter() - started
+    print("%d mazes, %d solvable, %.1f s (%.0f mazes/min) -> %s"
+          % (args.count, solvable, elapsed, args.count / elapsed * 60, args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import argparse
+import inspect
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from maze_components import pick_end, pick_start
+from maze_generators import generate, GENERATORS
+from maze_png import export_png
+from maze_render import render_svg
+from maze_solvers import search, step_costs, SolverWorkspace
+
+SIZES = (40, 200, 1000, 4000)
+OPEN_PROBABILITIES = (0.4, 0.5, 0.6)
+ENEMY_DENSITIES = (0.01, 0.05)
+# SVG output grows with the wall count, past this size only the PNG is timed
+SVG_LIMIT = 1000
+
+
+def measure(task, repeat=1, memory=True):
+    # best wall time over repeat runs, then one more run under tracemalloc for
+    # the peak (tracing slows allocation heavy code, so it is not timed)
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = task()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        task()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, best, peak
+
+
+def uses_open_probability(generator):
+    # only some generators take open_probability (random does, the spanning tree ones do not)
+    return 'open_probability' in inspect.signature(GENERATORS[generator]).parameters
+
+
+def bench_case(size, open_probability, enemy_density, generator='random', seed=0, repeat=3, memory=True,
+               render=True):
+    # one maze configuration, one record per phase
+    rows = cols = size
+    cells = rows * cols
+    num_enemies = int(cells * enemy_density)
+    options = {'num_enemies': num_enemies, 'num_rewards': 0, 'seed': seed}
+    if uses_open_probability(generator):
+        options['open_probability'] = open_probability
+    else:
+        # recorded as None, the maze does not depend on it
+        open_probability = None
+    repeat = repeat if cells <= 200 * 200 else 1
+    base = {'generator': generator, 'rows': rows, 'cols': cols, 'open_probability': open_probability,
+            'enemy_density': enemy_density, 'seed': seed}
+    records = []
+
+    def record(phase, seconds, peak, **extra):
+        entry = dict(base, phase=phase, seconds=seconds, peak_bytes=peak,
+                     cells_per_second=cells / seconds if seconds else None)
+        entry.update(extra)
+        records.append(entry)
+
+    grid, seconds, peak = measure(lambda: generate(generator, rows, cols, **options), repeat, memory)
+    record('generate', seconds, peak)
+
+    picker = random.Random(seed)
+    component_of = lambda row, col: grid.component(row * cols + col)
+    start = pick_start(component_of, rows, cols, picker)
+    if start is None:
+        return records
+    end = pick_end(component_of, rows, cols, start, picker)
+    source, target = grid.index(*start), grid.index(*end)
+    workspace = SolverWorkspace(grid.size)
+
+    # dijkstra routes uniform costs to bfs, so that is what gets timed
+    searches = [
+        ('dijkstra', lambda: search(grid, start, end, 'bfs', workspace=workspace)[0]),
+        ('astar', lambda: search(grid, start, end, 'astar', workspace=workspace)[0]),
+    ]
+    costs = step_costs(grid)
+    searches.append(('dial', lambda: search(grid, start, end, 'dial', costs=costs, workspace=workspace)[0]))
+    path = None
+    for phase, timed in searches:
+        expanded, seconds, peak = measure(timed, repeat, memory)
+        found = workspace.reached(target)
+        if found and path is None:
+            path = workspace.path(source, target, cols)
+        record(phase, seconds, peak, expanded=expanded, solved=found,
+               path_length=len(workspace.path(source, target, cols)) if found else None,
+               expanded_per_second=expanded / seconds if seconds else None)
+
+    if render:
+        renderers = [('render_png', export_png, 'maze.png')]
+        if size <= SVG_LIMIT:
+            renderers.append(('render_svg', render_svg, 'maze.svg'))
+        with tempfile.TemporaryDirectory() as scratch:
+            for phase, render_to, name in renderers:
+                file_name = os.path.join(scratch, name)
+                _, seconds, peak = measure(lambda: render_to(grid, path or [], [], start, end, [], [],
+                                                             file_name=file_name), 1, memory)
+                record(phase, seconds, peak, bytes=os.path.getsize(file_name))
+    return records
+
+
+def run(sizes=SIZES, open_probabilities=OPEN_PROBABILITIES, enemy_densities=ENEMY_DENSITIES, generator='random',
+        seed=0, repeat=3, memory=True, render=True, output='benchmark_results.jsonl'):
+    with open(output, 'w') as out:
+        for size in sizes:
+            # generators without the parameter are timed once, not once per value
+            for open_probability in open_probabilities if uses_open_probability(generator) else [None]:
+                for enemy_density in enemy_densities:
+                    for entry in bench_case(size, open_probability, enemy_density, generator, seed, repeat,
+                                            memory, render):
+                        out.write(json.dumps(entry) + "\n")
+                        out.flush()
+                        print("%5dx%-5d p=%-4s enemies=%.2f %-11s %9.4f s"
+                              % (entry['rows'], entry['cols'], '-' if open_probability is None
+                                 else '%.2f' % open_probability, enemy_density, entry['phase'], entry['seconds']))
+
+
+def compare(baseline, current, threshold=0.10):
+    # phases that got more than threshold slower between two result files
+    def load(file_name):
+        with open(file_name) as source:
+            entries = [json.loads(line) for line in source if line.strip()]
+        return {(e['generator'], e['rows'], e['cols'], e['open_probability'], e['enemy_density'], e['seed'],
+                 e['phase']): e for e in entries}
+
+    before, after = load(baseline), load(current)
+    slower = []
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key]['seconds'], after[key]['seconds']
+        if old and new > old * (1 + threshold):
+            slower.append((key, old, new))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time maze generation, solving and rendering over a sweep.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--open', type=float, nargs='+', default=list(OPEN_PROBABILITIES))
+    parser.add_argument('--enemies', type=float, nargs='+', default=list(ENEMY_DENSITIES),
+                        help="fraction of cells holding an enemy")
+    parser.add_argument('--generator', default='random')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="best of this many runs, small mazes only")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc runs")
+    parser.add_argument('--no-render', action='store_true')
+    parser.add_argument('--output', default='benchmark_results.jsonl')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help="report phases that got slower instead of running")
+    parser.add_argument('--threshold', type=float, default=0.10)
+    args = parser.parse_args()
+
+    if args.compare:
+        slower = compare(args.compare[0], args.compare[1], args.threshold)
+        for key, old, new in slower:
+            print("%s: %.4f s -> %.4f s (%+.0f%%)" % (key, old, new, 100 * (new / old - 1)))
+        print("%d slower by more than %.0f%%" % (len(slower), 100 * args.threshold))
+        return
+    run(args.sizes, args.open, args.enemies, args.generator, args.seed, args.repeat, not args.no_memory,
+        not args.no_render, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import random
+import tempfile
+
+from maze_checks import or_none
+from maze_generators import generate_random_grid
+from maze_solvers import astar, dial, octile
+from solution_cache import SolutionCache
+
+
+# Solves seeded mazes through SolutionCache.wrap, with options passed both
+# by position and by keyword, and checks every answer against calling the
+# solver directly. Asking again must hit the cache, the keyword order must
+# not change the key, and a second cache on the same directory must find
+# the entries on disk.
+def compare_cache(trials=200, rows=20, cols=20, seed=0):
+    picker = random.Random(seed)
+    report = {'trials': trials, 'calls': 0, 'wrong_answers': [], 'missed': 0}
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SolutionCache(directory=directory)
+        cached_astar, cached_dial = cache.wrap(astar), cache.wrap(dial)
+        calls = [
+            (astar, (), {}),
+            (astar, (octile,), {}),
+            (astar, (), {'heuristic': octile}),
+            (astar, (), {'heuristic': 'zero'}),
+            (dial, (2, 5), {}),
+            (dial, (), {'radius': 4, 'weight': 10, 'enemy_cost': 300}),
+        ]
+        for trial in range(trials):
+            grid = generate_random_grid(rows, cols, num_enemies=rows * cols // 20, num_rewards=0,
+                                        seed=seed + trial, open_probability=0.6)
+            start, end = (picker.randint(0, rows - 1), 0), (picker.randint(0, rows - 1), cols - 1)
+            for solver, options, keywords in calls:
+                wrapped = cached_astar if solver is astar else cached_dial
+                expected = or_none(solver, grid, start, end, *options, **keywords)
+                hits = cache.hits
+                for _ in range(2):
+                    report['calls'] += 1
+                    found = or_none(wrapped, grid, start, end, *options, **keywords)
+                    if found != expected:
+                        report['wrong_answers'].append((seed + trial, solver.__name__, options, keywords))
+                if cache.hits != hits + 1:
+                    report['missed'] += 1
+            # the same keywords passed in the other order share one entry
+            hits = cache.hits
+            or_none(cached_dial, grid, start, end, enemy_cost=300, weight=10, radius=4)
+            report['missed'] += cache.hits != hits + 1
+
+        reopened = SolutionCache(directory=directory)
+        or_none(reopened.wrap(astar), grid, start, end, heuristic=octile)
+        report['missed'] += reopened.disk_hits != 1
+
+    return report
+
+
+if __name__ == "__main__":
+    result = compare_cache()
+    print("calls:", result['calls'], "wrong answers:", len(result['wrong_answers']),
+          "expected hits missed:", result['missed'])
@@ -0,0 +1,50 @@
+import random
+
+from corridor_graph import CorridorGraph
+from maze_checks import or_none, walkable
+from maze_generators import generate
+from maze_solvers import bfs
+
+# generator -> options, from open rooms to perfect mazes with few junctions
+KINDS = (('random', {'open_probability': 0.6}), ('kruskal', {'braid': 0.3}), ('backtracker', {}))
+
+
+# Queries a CorridorGraph on seeded mazes of every shape (down to one row or
+# column) while enemies are added and removed through set_enemy, and checks
+# each answer against BFS on the same grid: same length, or no path for
+# both, and a path that starts and ends right and only takes open steps.
+def compare_corridors(trials=300, max_rows=30, max_cols=30, queries=12, seed=0):
+    picker = random.Random(seed)
+    report = {'trials': trials, 'queries': 0, 'solvable': 0, 'mismatches': [], 'bad_paths': []}
+
+    for trial in range(trials):
+        rows, cols = picker.randint(1, max_rows), picker.randint(1, max_cols)
+        name, options = KINDS[trial % len(KINDS)]
+        grid = generate(name, rows, cols, num_enemies=picker.randint(0, rows * cols // 10), num_rewards=0,
+                        seed=seed + trial, **options)
+        graph = CorridorGraph(grid)
+        for query in range(queries):
+            if query >= queries // 3:
+                for _ in range(2):
+                    graph.set_enemy(picker.randrange(rows), picker.randrange(cols), picker.random() < 0.7)
+            start = (picker.randrange(rows), picker.randrange(cols))
+            end = (picker.randrange(rows), picker.randrange(cols))
+            shortest = or_none(bfs, grid, start, end)
+            path = or_none(graph.path, start, end)
+            report['queries'] += 1
+            expected = None if shortest is None else len(shortest) - 1
+            found = None if path is None else len(path) - 1
+            if found != expected:
+                report['mismatches'].append((seed + trial, query, start, end, expected, found))
+            elif path is not None:
+                report['solvable'] += 1
+                if not walkable(grid, path, start, end):
+                    report['bad_paths'].append((seed + trial, query, start, end))
+
+    return report
+
+
+if __name__ == "__main__":
+    result = compare_corridors()
+    print("queries:", result['queries'], "solvable:", result['solvable'],
+          "wrong lengths:", len(result['mismatches']), "bad paths:", len(result['bad_paths']))
@@ -0,0 +1,355 @@
+import heapq
+import time
+from array import array
+from collections import deque
+
+from maze_grid import as_grid
+from maze_solvers import manhattan, NoPathError, search, SolverWorkspace
+
+
+class CorridorGraph:
+    # Preprocessed maze for repeated queries. Dead-end filling first peels
+    # off every cell that is left with a single way out; what is peeled off
+    # forms trees, and each cell of them only keeps a parent pointer towards
+    # the cell it hangs from. In the remaining core, every chain of degree 2
+    # cells becomes one weighted edge (a corridor) between two junctions.
+    # Queries climb the trees, run A* over the junctions and only turn
+    # corridors back into cells for the path that was found.
+    #
+    # An enemy placed on a corridor or junction is patched in locally: the
+    # cut corridors become trees hanging off their other end. Enemies on tree
+    # cells need nothing, a climb stops at them. Removing an enemy can join
+    # things up again, so that rebuilds on the next query. Enemy changes
+    # have to go through set_enemy to be seen.
+    def __init__(self, maze):
+        self.grid = as_grid(maze)
+        self.expanded = 0
+        self._build()
+
+    def _build(self):
+        started = time.perf_counter()
+        grid = self.grid
+        size = grid.size
+        neighbors, is_enemy = grid.neighbors, grid.is_enemy
+        # tree cells: the cell they hang from, -1 for the last cell of a
+        # component that was filled completely (and for enemies)
+        self.parent = parent = array('i', [-1]) * size
+        # core cells that are not junctions: their corridor and 1 based offset in it
+        self.corridor = corridor = array('i', [-1]) * size
+        self.offset = array('i', [0]) * size
+        # junction -> {corridor id: junction at the other end}
+        self.edges = {}
+        # corridor id -> (junction, junction, cells in between)
+        self.corridors = {}
+        self._next_corridor = 0
+        self._stale = False
+
+        # dead-end filling
+        degree = array('i', [0]) * size
+        core = bytearray(size)
+        queue = deque()
+        for index in range(size):
+            if not is_enemy(index):
+                core[index] = 1
+                degree[index] = len(neighbors(index))
+                if degree[index] <= 1:
+                    queue.append(index)
+        while queue:
+            current = queue.popleft()
+            core[current] = 0
+            for neighbor in neighbors(current):
+                if core[neighbor]:
+                    parent[current] = neighbor
+                    degree[neighbor] -= 1
+                    if degree[neighbor] == 1:
+                        queue.append(neighbor)
+                    break
+        self.filled = size - sum(core) - len(grid.enemies())
+
+        # corridor contraction; cycles with no junction on them get one
+        self.core_cells = sum(core)
+        junctions = [index for index in range(size) if core[index] and degree[index] != 2]
+        for junction in junctions:
+            self.edges[junction] = {}
+        for junction in junctions:
+            self._trace_from(junction, core)
+        for index in range(size):
+            if core[index] and corridor[index] < 0 and index not in self.edges:
+                self.edges[index] = {}
+                self._trace_from(index, core)
+        self.build_seconds = time.perf_counter() - started
+
+    def _trace_from(self, junction, core):
+        neighbors, edges, corridor, offset = self.grid.neighbors, self.edges, self.corridor, self.offset
+        for first in neighbors(junction):
+            if not core[first] or corridor[first] >= 0 or first in edges and first < junction:
+                continue
+            cells = array('i')
+            previous, current = junction, first
+            while current not in edges:
+                cells.append(current)
+                previous, current = current, next(n for n in neighbors(current) if core[n] and n != previous)
+            number = self._next_corridor
+            self._next_corridor += 1
+            for position, cell in enumerate(cells):
+                corridor[cell] = number
+                offset[cell] = position + 1
+            self.corridors[number] = (junction, current, cells)
+            edges[junction][number] = current
+            edges[current][number] = junction
+
+    # local updates
+
+    def set_enemy(self, row, col, value=True):
+        grid = self.grid
+        index = grid.index(row, col)
+        if grid.is_enemy(index) == value:
+            return
+        grid.set_enemy(index, value)
+        if not value:
+            self._stale = True
+            return
+        if self.corridor[index] >= 0:
+            self._cut(self.corridor[index], index)
+            self.corridor[index] = -1
+        elif index in self.edges:
+            for number in list(self.edges.pop(index)):
+                self._cut(number, index)
+        self.parent[index] = -1
+
+    def _cut(self, number, blocked):
+        # drop a corridor; its cells on either side of the blocked cell (or
+        # all of them, when a junction is blocked) now hang off the junction
+        # at their end
+        first, last, cells = self.corridors.pop(number)
+        parent, corridor = self.parent, self.corridor
+        for junction in (first, last):
+            if junction != blocked and junction in self.edges:
+                self.edges[junction].pop(number, None)
+        cut = self.offset[blocked] - 1 if corridor[blocked] == number else len(cells)
+        above = first
+        for cell in cells[:cut]:
+            parent[cell] = above
+            corridor[cell] = -1
+            above = cell
+        if blocked == first:
+            cut = -1
+        above = last
+        for cell in reversed(cells[cut + 1:]):
+            parent[cell] = above
+            corridor[cell] = -1
+            above = cell
+
+    # queries
+
+    def _climb(self, source, target):
+        # Walks up from both ends in turn until the walks meet (the ends share
+        # a tree and the path stays in it) or each reaches the core. A walk
+        # that reaches the root of a filled component or an enemy ends with
+        # None: nothing beyond the tree it walked is reachable from there.
+        grid, parent, corridor, edges = self.grid, self.parent, self.corridor, self.edges
+        chains = ([source], [target])
+        seen = ({source: 0}, {target: 0})
+        tops = [None, None]
+        active = [True, True]
+        while active[0] or active[1]:
+            for side in (0, 1):
+                if not active[side]:
+                    continue
+                chain = chains[side]
+                current = chain[-1]
+                if corridor[current] >= 0 or current in edges:
+                    active[side] = False
+                    tops[side] = current
+                    continue
+                above = parent[current]
+                if above < 0 or grid.is_enemy(above):
+                    active[side] = False
+                    continue
+                chain.append(above)
+                seen[side][above] = len(chain) - 1
+                meet = seen[1 - side].get(above)
+                if meet is not None:
+                    other = chains[1 - side][:meet]
+                    if side == 0:
+                        return chain + other[::-1], None
+                    return other + chain[::-1], None
+        return chains, tops
+
+    def _anchors(self, cell):
+        # (junction, steps, corridor, towards its first end) ways from a core
+        # cell into the junction graph
+        if cell in self.edges:
+            return [(cell, 0, None, None)]
+        number = self.corridor[cell]
+        first, last, cells = self.corridors[number]
+        position = self.offset[cell]
+        return [(first, position, number, True), (last, len(cells) + 1 - position, number, False)]
+
+    def _walk(self, number, cell, towards_first):
+        # the cells from a corridor cell (excluded) to one end (included)
+        first, last, cells = self.corridors[number]
+        position = self.offset[cell]
+        if towards_first:
+            return list(cells[:position - 1])[::-1] + [first]
+        return list(cells[position:]) + [last]
+
+    def abstract_path(self, start, end):
+        # the path as cell indices
+        if self._stale:
+            self._build()
+        grid = self.grid
+        cols = grid.cols
+        source, target = grid.index(*start), grid.index(*end)
+        if source == target:
+            return [source]
+        if grid.is_enemy(target):
+            raise NoPathError("No path found")
+        if grid.is_enemy(source):
+            # step off an enemy start first, like the flat solvers do
+            best = None
+            for neighbor in grid.neighbors(source):
+                try:
+                    path = self.abstract_path(divmod(neighbor, cols), end)
+                except NoPathError:
+                    continue
+                if best is None or len(path) < len(best):
+                    best = path
+            if best is None:
+                raise NoPathError("No path found")
+            return [source] + best
+
+        chains, tops = self._climb(source, target)
+        if tops is None:
+            return chains
+        if tops[0] is None or tops[1] is None:
+            raise NoPathError("No path found")
+        start_chain, end_chain = chains
+        start_top, end_top = tops
+        base = len(start_chain) - 1
+        goals = {}
+        for junction, steps, number, towards_first in self._anchors(end_top):
+            cost = len(end_chain) - 1 + steps
+            if cost < goals.get(junction, (cost + 1,))[0]:
+                goals[junction] = (cost, number, towards_first)
+
+        # both tops on one corridor: straight along it
+        best_length, best_end = float('inf'), None
+        if start_top not in self.edges and self.corridor[start_top] == self.corridor[end_top] \
+                and end_top not in self.edges:
+            best_length = base + len(end_chain) - 1 + abs(self.offset[start_top] - self.offset[end_top])
+
+        end_row, end_col = end
+        corridors = self.corridors
+        best = {}
+        parent = {}
+        frontier = []
+        for junction, steps, number, towards_first in self._anchors(start_top):
+            if base + steps < best.get(junction, float('inf')):
+                best[junction] = base + steps
+                parent[junction] = (None, number, towards_first)
+                row, col = divmod(junction, cols)
+                heapq.heappush(frontier, (base + steps + manhattan(abs(row - end_row), abs(col - end_col)),
+                                          -base - steps, junction))
+        while frontier:
+            estimate, negative_g, current = heapq.heappop(frontier)
+            g = -negative_g
+            if estimate >= best_length:
+                break
+            if g > best[current]:
+                continue
+            self.expanded += 1
+            if current in goals and g + goals[current][0] < best_length:
+                best_length, best_end = g + goals[current][0], current
+            for number, following in self.edges[current].items():
+                distance = g + len(corridors[number][2]) + 1
+                if distance < best.get(following, distance + 1):
+                    best[following] = distance
+                    parent[following] = (current, number, None)
+                    row, col = divmod(following, cols)
+                    heapq.heappush(frontier, (distance + manhattan(abs(row - end_row), abs(col - end_col)),
+                                              -distance, following))
+        if best_length == float('inf'):
+            raise NoPathError("No path found")
+
+        if best_end is None:
+            # straight along the shared corridor
+            first, last, cells = corridors[self.corridor[start_top]]
+            low, high = self.offset[start_top], self.offset[end_top]
+            middle = list(cells[low - 1:high]) if low <= high else list(cells[high - 1:low])[::-1]
+            return start_chain[:-1] + middle + end_chain[-2::-1]
+
+        hops = []
+        current = best_end
+        while current is not None:
+            above, number, towards_first = parent[current]
+            hops.append((above, number, towards_first, current))
+            current = above
+        hops.reverse()
+        path = list(start_chain)
+        _, number, towards_first, junction = hops[0]
+        if start_top != junction:
+            path.extend(self._walk(number, start_top, towards_first))
+        for above, number, _, junction in hops[1:]:
+            first, last, cells = corridors[number]
+            path.extend((list(cells) if above == first else list(cells)[::-1]) + [junction])
+        _, number, towards_first = goals[best_end]
+        if end_top != best_end:
+            path.extend(self._walk(number, end_top, towards_first)[-2::-1] + [end_top])
+        path.extend(end_chain[-2::-1])
+        return path
+
+    def path(self, start, end):
+        cols = self.grid.cols
+        return [divmod(index, cols) for index in self.abstract_path(start, end)]
+
+    def stats(self):
+        junctions = len(self.edges)
+        cells = self.grid.size
+        return {'cells': cells, 'filled': self.filled, 'core_cells': self.core_cells, 'junctions': junctions,
+                'corridors': len(self.corridors), 'compression': cells / max(1, junctions),
+                'build_seconds': self.build_seconds}
+
+
+def compare_flat(maze, queries):
+    # per query: flat astar against the same query on the junction graph
+    grid = as_grid(maze)
+    graph = CorridorGraph(grid)
+    workspace = SolverWorkspace(grid.size)
+    report = []
+    for start, end in queries:
+        source, target = grid.index(*start), grid.index(*end)
+        started = time.perf_counter()
+        flat_expanded, _ = search(grid, start, end, 'astar', workspace=workspace)
+        flat = time.perf_counter() - started
+        expected = len(workspace.path(source, target, grid.cols)) - 1 if workspace.reached(target) else None
+        graph.expanded = 0
+        started = time.perf_counter()
+        try:
+            length = len(graph.path(start, end)) - 1
+        except NoPathError:
+            length = None
+        contracted = time.perf_counter() - started
+        report.append({'start': start, 'end': end, 'length': expected, 'graph_length': length,
+                       'flat_ms': 1000 * flat, 'flat_expanded': flat_expanded, 'graph_ms': 1000 * contracted,
+                       'graph_expanded': graph.expanded, 'speedup': flat / contracted if contracted else None})
+    return graph, report
+
+
+if __name__ == "__main__":
+    import random
+
+    from maze_generators import generate
+
+    rows = cols = 1000
+    maze = generate('kruskal', rows, cols, num_enemies=rows * cols // 1000, num_rewards=0, seed=1, braid=0.2)
+    picker = random.Random(1)
+    queries = [((picker.randrange(rows), picker.randrange(cols)), (picker.randrange(rows), picker.randrange(cols)))
+               for _ in range(8)]
+    graph, report = compare_flat(maze, queries)
+    print(", ".join("%s %s" % (key, round(value, 2) if isinstance(value, float) else value)
+                    for key, value in graph.stats().items()))
+    for row in report:
+        print("%-12s -> %-12s length %-6s graph %-6s flat %8.1f ms  graph %7.1f ms  speedup %6.1fx"
+              % (row['start'], row['end'], row['length'], row['graph_length'], row['flat_ms'], row['graph_ms'],
+                 row['speedup'] or 0.0))
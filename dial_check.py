@@ -0,0 +1,73 @@
+import heapq
+import random
+
+from maze_generators import generate_random_grid
+from maze_solvers import search, step_costs, SolverWorkspace
+
+# (radius, weight, enemy_cost) settings, the last two past one byte per cost
+SETTINGS = ((3, 4, None), (2, 1, 5), (10, 30, None), (4, 10, 300))
+
+
+# Runs Dial's bucket queue and a plain heapq Dijkstra over the same step
+# costs on seeded mazes and checks that both find the same total cost, and
+# that the cost of the path dial returns adds up to it.
+def compare_dial(trials=500, rows=30, cols=30, seed=0, open_probability=0.6):
+    picker = random.Random(seed)
+    report = {'trials': trials, 'solvable': 0, 'mismatches': [], 'bad_paths': []}
+
+    for trial in range(trials):
+        grid = generate_random_grid(rows, cols, num_enemies=rows * cols // 40, num_rewards=0,
+                                    seed=seed + trial, open_probability=open_probability)
+        radius, weight, enemy_cost = SETTINGS[trial % len(SETTINGS)]
+        costs = step_costs(grid, radius, weight, enemy_cost)
+        start, end = (picker.randint(0, rows - 1), 0), (picker.randint(0, rows - 1), cols - 1)
+        source, target = grid.index(*start), grid.index(*end)
+
+        workspace = SolverWorkspace(grid.size)
+        search(grid, start, end, 'dial', costs=costs, workspace=workspace)
+        found = workspace.dist[target] if workspace.reached(target) else None
+        expected = _dijkstra(grid, source, target, costs)
+        if found != expected:
+            report['mismatches'].append((seed + trial, expected, found))
+            continue
+        if found is None:
+            continue
+        report['solvable'] += 1
+        path = workspace.path(source, target, cols)
+        walked = 0
+        for a, b in zip(path, path[1:]):
+            index = grid.index(*b)
+            if index not in grid.open_neighbors(grid.index(*a)) or not costs[index]:
+                walked = None
+                break
+            walked += costs[index]
+        if walked != found:
+            report['bad_paths'].append((seed + trial, found, walked))
+
+    return report
+
+
+def _dijkstra(grid, source, target, costs):
+    # the textbook version: a heap of (distance, cell), stale entries skipped
+    best = {source: 0}
+    frontier = [(0, source)]
+    while frontier:
+        distance, current = heapq.heappop(frontier)
+        if current == target:
+            return distance
+        if distance > best[current]:
+            continue
+        for neighbor in grid.open_neighbors(current):
+            if not costs[neighbor]:
+                continue
+            candidate = distance + costs[neighbor]
+            if candidate < best.get(neighbor, candidate + 1):
+                best[neighbor] = candidate
+                heapq.heappush(frontier, (candidate, neighbor))
+    return None
+
+
+if __name__ == "__main__":
+    result = compare_dial()
+    print("solvable:", result['solvable'], "of", result['trials'],
+          "wrong costs:", len(result['mismatches']), "bad paths:", len(result['bad_paths']))
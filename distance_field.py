@@ -0,0 +1,134 @@
+import heapq
+from array import array
+from collections import deque
+
+from maze_grid import as_grid, LEFT, RIGHT, UP, DOWN
+from maze_solvers import NoPathError
+
+INF = float('inf')
+
+
+class DistanceField:
+    # One reverse BFS from the goal answers every start on the same maze:
+    # dist[i] is the number of steps from cell i to the goal (-1 when it
+    # cannot get there) and toward[i] is the side of the cell to leave by.
+    def __init__(self, maze, goal):
+        self.grid = as_grid(maze)
+        cols = self.grid.cols
+        self.goal = goal[0] * cols + goal[1]
+        self.step = {LEFT: -1, RIGHT: 1, UP: -cols, DOWN: cols}
+        self.side = {-1: LEFT, 1: RIGHT, -cols: UP, cols: DOWN}
+        self.dist = array('i', [-1]) * self.grid.size
+        self.toward = bytearray(self.grid.size)
+        if not self.grid.is_enemy(self.goal):
+            self._fill()
+
+    def _fill(self):
+        neighbors = self.grid.neighbors
+        dist, toward, side = self.dist, self.toward, self.side
+        dist[self.goal] = 0
+        queue = deque([self.goal])
+        while queue:
+            current = queue.popleft()
+            next_distance = dist[current] + 1
+            for neighbor in neighbors(current):
+                if dist[neighbor] == -1:
+                    dist[neighbor] = next_distance
+                    toward[neighbor] = side[current - neighbor]
+                    queue.append(neighbor)
+
+    def distance(self, start):
+        index = self._start(start)
+        if index is None:
+            return INF
+        steps = 0 if index == self.goal else self.dist[index]
+        # one more step when the start had to walk off an enemy first
+        return steps + (index != start[0] * self.grid.cols + start[1])
+
+    def path(self, start):
+        cols = self.grid.cols
+        first = start[0] * cols + start[1]
+        current = self._start(start)
+        if current is None:
+            raise NoPathError("No path found")
+        path = [divmod(first, cols)]
+        if current != first:
+            path.append(divmod(current, cols))
+        step, toward = self.step, self.toward
+        while current != self.goal:
+            current += step[toward[current]]
+            path.append(divmod(current, cols))
+        return path
+
+    def _start(self, start):
+        # cell the walk to the goal starts from; a start standing on an enemy
+        # may still walk off it, like bfs allows
+        index = start[0] * self.grid.cols + start[1]
+        if self.dist[index] != -1 or index == self.goal:
+            return index
+        if self.grid.is_enemy(index):
+            reachable = [n for n in self.grid.neighbors(index) if self.dist[n] != -1]
+            if reachable:
+                return min(reachable, key=self.dist.__getitem__)
+        return None
+
+    def add_enemy(self, row, col):
+        # Only cells whose route ran through the new enemy can get longer.
+        # Drop that subtree and fill it again from its intact border.
+        grid = self.grid
+        index = row * grid.cols + col
+        if grid.is_enemy(index):
+            return
+        grid.set_enemy(index)
+        dist, toward, step = self.dist, self.toward, self.step
+        if dist[index] == -1:
+            return
+
+        lost = [index]
+        dist[index] = -1
+        toward[index] = 0
+        queue = deque([index])
+        while queue:
+            current = queue.popleft()
+            for neighbor in grid.open_neighbors(current):
+                if dist[neighbor] != -1 and toward[neighbor] and neighbor + step[toward[neighbor]] == current:
+                    dist[neighbor] = -1
+                    toward[neighbor] = 0
+                    lost.append(neighbor)
+                    queue.append(neighbor)
+
+        frontier = []
+        for cell in lost[1:]:
+            for neighbor in grid.neighbors(cell):
+                if dist[neighbor] != -1:
+                    heapq.heappush(frontier, (dist[neighbor] + 1, cell, neighbor))
+        self._settle(frontier)
+
+    def remove_enemy(self, row, col):
+        grid = self.grid
+        index = row * grid.cols + col
+        if not grid.is_enemy(index):
+            return
+        grid.set_enemy(index, False)
+        if index == self.goal:
+            self.dist = array('i', [-1]) * grid.size
+            self.toward = bytearray(grid.size)
+            self._fill()
+            return
+        frontier = [(self.dist[n] + 1, index, n) for n in grid.neighbors(index) if self.dist[n] != -1]
+        heapq.heapify(frontier)
+        self._settle(frontier)
+
+    def _settle(self, frontier):
+        # Dijkstra over (distance, cell, reached from), keeping only improvements
+        neighbors = self.grid.neighbors
+        dist, toward, side = self.dist, self.toward, self.side
+        while frontier:
+            distance, cell, source = heapq.heappop(frontier)
+            if dist[cell] != -1 and dist[cell] <= distance:
+                continue
+            dist[cell] = distance
+            toward[cell] = side[source - cell]
+            for neighbor in neighbors(cell):
+                if dist[neighbor] == -1 or dist[neighbor] > distance + 1:
+                    heapq.heappush(frontier, (distance + 1, neighbor, cell))
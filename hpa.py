@@ -0,0 +1,460 @@
+import heapq
+import time
+from collections import deque
+
+from maze_grid import as_grid, LEFT, RIGHT, UP, DOWN
+from maze_solvers import manhattan, NoPathError, search, SolverWorkspace
+
+
+# landmarks placed by default for the ALT lower bounds, and how many of
+# them a single query consults
+LANDMARKS = 16
+ACTIVE_LANDMARKS = 4
+
+
+class HierarchicalPlanner:
+    # HPA* over square clusters of cluster_size cells. Open passages across a
+    # cluster border become entrances: one crossing from the middle of every
+    # run of neighbouring open crossings, or every crossing with exact=True.
+    # Each entrance caches its legs: the in-cluster distance to the other
+    # entrances of its cluster and the step over the border. Queries search
+    # that small graph and only turn the result into cells (one in-cluster
+    # BFS per leg) while the path is being walked.
+    #
+    # prepare() builds every cluster, labels the connected parts of the
+    # entrance graph and runs one Dijkstra per landmark over it. A query
+    # whose ends see no common label is rejected after one in-cluster BFS
+    # per end. The others use the landmark distances as A* lower bounds
+    # (ALT), so a search expands little beyond the entrances on its path.
+    #
+    # With exact=False paths can come out a few steps longer than the
+    # shortest one, which is the usual HPA* trade. An enemy change drops only
+    # its own cluster and, on a border cell, the clusters whose steps lead
+    # into it; they are rebuilt when a query reaches them. New enemies only
+    # make distances longer and split components, so labels and landmarks
+    # stay valid bounds; a query that then finds no path relabels. Removing
+    # an enemy invalidates both until the next prepare().
+    def __init__(self, maze, cluster_size=16, exact=False, landmarks=LANDMARKS):
+        self.grid = as_grid(maze)
+        self.size = cluster_size
+        self.exact = exact
+        self.cluster_cols = (self.grid.cols + cluster_size - 1) // cluster_size
+        self.cluster_count = (self.grid.rows + cluster_size - 1) // cluster_size * self.cluster_cols
+        # cluster -> its entrances, entrance -> [(next node, cost), ...]
+        self.clusters = {}
+        self.legs = {}
+        # entrance -> connected part of the entrance graph, None when unknown
+        self.labels = None
+        self.labels_fresh = False
+        # entrance -> distance from every landmark
+        self.landmark_count = landmarks
+        self.landmarks = []
+        self.bounds = {}
+        self.builds = 0
+        self.expanded = 0
+        self.prepare()
+
+    def prepare(self):
+        started = time.perf_counter()
+        for cluster in range(self.cluster_count):
+            if cluster not in self.clusters:
+                self._build(cluster)
+        self._label()
+        self._place_landmarks()
+        self.prepare_seconds = time.perf_counter() - started
+
+    def _label(self):
+        for cluster in range(self.cluster_count):
+            if cluster not in self.clusters:
+                self._build(cluster)
+        legs = self.legs
+        labels = {}
+        for entrance in legs:
+            if entrance in labels:
+                continue
+            label = entrance
+            labels[entrance] = label
+            queue = [entrance]
+            for current in queue:
+                for following, _ in legs[current]:
+                    if following not in labels:
+                        labels[following] = label
+                        queue.append(following)
+        self.labels = labels
+        self.labels_fresh = True
+
+    def _distances(self, source):
+        # Dijkstra over the entrance graph
+        legs = self.legs
+        dist = {source: 0}
+        frontier = [(0, source)]
+        while frontier:
+            distance, current = heapq.heappop(frontier)
+            if distance > dist[current]:
+                continue
+            for following, cost in legs[current]:
+                candidate = distance + cost
+                if candidate < dist.get(following, candidate + 1):
+                    dist[following] = candidate
+                    heapq.heappush(frontier, (candidate, following))
+        return dist
+
+    def _place_landmarks(self):
+        # farthest point placement in the biggest connected part: each new
+        # landmark is the entrance farthest from the ones already placed
+        self.landmarks = []
+        self.bounds = {}
+        if not self.landmark_count or not self.labels:
+            return
+        sizes = {}
+        for label in self.labels.values():
+            sizes[label] = sizes.get(label, 0) + 1
+        biggest = max(sizes, key=sizes.get)
+        seed = next(entrance for entrance, label in self.labels.items() if label == biggest)
+        nearest = self._distances(seed)
+        tables = []
+        for _ in range(self.landmark_count):
+            landmark = max(nearest, key=nearest.get)
+            if nearest[landmark] == 0 and tables:
+                break
+            table = self._distances(landmark)
+            tables.append(table)
+            self.landmarks.append(landmark)
+            nearest = {entrance: min(distance, table[entrance]) for entrance, distance in nearest.items()}
+        self.bounds = {entrance: tuple(table[entrance] for table in tables) for entrance in tables[0]}
+
+    def cluster(self, index):
+        row, col = divmod(index, self.grid.cols)
+        return (row // self.size) * self.cluster_cols + col // self.size
+
+    def _bounds(self, cluster):
+        rows, cols, size = self.grid.rows, self.grid.cols, self.size
+        top, left = divmod(cluster, self.cluster_cols)
+        top, left = top * size, left * size
+        return top, left, min(top + size, rows) - 1, min(left + size, cols) - 1
+
+    # cluster abstraction
+
+    def crossings(self, cluster):
+        # (inside, outside) cell pairs chosen as entrances on the four borders.
+        # A run only goes on while the cells on both sides are open to each
+        # other along the border, so any crossing of a run reaches the rest;
+        # both clusters of a border see the same runs and pick the same ones.
+        grid = self.grid
+        rows, cols, walls = grid.rows, grid.cols, grid.walls
+        is_enemy = grid.is_enemy
+        top, left, bottom, right = self._bounds(cluster)
+        borders = []
+        if top > 0:
+            borders.append((UP, -cols, RIGHT, range(top * cols + left, top * cols + right + 1)))
+        if bottom < rows - 1:
+            borders.append((DOWN, cols, RIGHT, range(bottom * cols + left, bottom * cols + right + 1)))
+        if left > 0:
+            borders.append((LEFT, -1, DOWN, range(top * cols + left, bottom * cols + left + 1, cols)))
+        if right < cols - 1:
+            borders.append((RIGHT, 1, DOWN, range(top * cols + right, bottom * cols + right + 1, cols)))
+
+        chosen = []
+        for side, step, along, cells in borders:
+            runs = []
+            previous = None
+            for index in cells:
+                outside = index + step
+                if walls[index] & side or is_enemy(index) or is_enemy(outside):
+                    previous = None
+                    continue
+                if previous is None or walls[previous] & along or walls[previous + step] & along:
+                    runs.append([])
+                runs[-1].append((index, outside))
+                previous = index
+            for run in runs:
+                chosen.extend(run if self.exact else [run[len(run) // 2]])
+        return chosen
+
+    def _build(self, cluster):
+        # One BFS per entrance over the cluster's own cells, on local indices.
+        # A leg is only kept when some shortest way to the other entrance
+        # passes no third one: otherwise the two shorter legs through that
+        # entrance add up to it, so every distance stays the same with far
+        # fewer legs to relax.
+        self.builds += 1
+        grid = self.grid
+        cols = grid.cols
+        top, left, bottom, right = self._bounds(cluster)
+        cells = [row * cols + col for row in range(top, bottom + 1) for col in range(left, right + 1)]
+        position = {cell: local for local, cell in enumerate(cells)}
+        adjacency = [[position[n] for n in grid.neighbors(cell) if n in position] for cell in cells]
+        crossings = self.crossings(cluster)
+        entrances = list(dict.fromkeys(inside for inside, _ in crossings))
+        is_entrance = [False] * len(cells)
+        for entrance in entrances:
+            is_entrance[position[entrance]] = True
+        steps = {}
+        for inside, outside in crossings:
+            steps.setdefault(inside, []).append(outside)
+        for entrance in entrances:
+            source = position[entrance]
+            dist = [-1] * len(cells)
+            # reached along some shortest way with no entrance in between
+            direct = [False] * len(cells)
+            dist[source] = 0
+            direct[source] = True
+            queue = [source]
+            for current in queue:
+                following = dist[current] + 1
+                carry = direct[current] and (current == source or not is_entrance[current])
+                for neighbor in adjacency[current]:
+                    if dist[neighbor] < 0:
+                        dist[neighbor] = following
+                        direct[neighbor] = carry
+                        queue.append(neighbor)
+                    elif carry and dist[neighbor] == following:
+                        direct[neighbor] = True
+            legs = [(other, dist[position[other]]) for other in entrances
+                    if other != entrance and dist[position[other]] > 0 and direct[position[other]]]
+            legs.extend((outside, 1) for outside in steps[entrance])
+            self.legs[entrance] = legs
+        self.clusters[cluster] = entrances
+
+    def _drop(self, cluster):
+        for entrance in self.clusters.pop(cluster, ()):
+            del self.legs[entrance]
+
+    def _node_legs(self, index):
+        legs = self.legs.get(index)
+        if legs is None:
+            cluster = self.cluster(index)
+            if cluster not in self.clusters:
+                self._build(cluster)
+            legs = self.legs.get(index, ())
+        return legs
+
+    def set_enemy(self, row, col, value=True):
+        grid = self.grid
+        index = grid.index(row, col)
+        if grid.is_enemy(index) == value:
+            return
+        grid.set_enemy(index, value)
+        self.labels_fresh = False
+        if not value:
+            # distances can get shorter and parts join up
+            self.labels = None
+            self.bounds = {}
+            self.landmarks = []
+        home = self.cluster(index)
+        self._drop(home)
+        for neighbor in grid.open_neighbors(index):
+            if self.cluster(neighbor) != home:
+                self._drop(self.cluster(neighbor))
+
+    def _search(self, source, target=None):
+        # BFS from source that never leaves the source's cluster
+        neighbors, size = self.grid.neighbors, self.size
+        top, left, bottom, right = self._bounds(self.cluster(source))
+        cols = self.grid.cols
+        dist = {source: 0}
+        parent = {source: source}
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            if current == target:
+                break
+            for neighbor in neighbors(current):
+                if neighbor not in dist:
+                    row, col = divmod(neighbor, cols)
+                    if top <= row <= bottom and left <= col <= right:
+                        dist[neighbor] = dist[current] + 1
+                        parent[neighbor] = current
+                        queue.append(neighbor)
+        return dist, parent
+
+    # queries
+
+    def abstract_path(self, start, end):
+        # the start, the entrances passed through and the end, with the length
+        grid = self.grid
+        cols = grid.cols
+        source, target = grid.index(*start), grid.index(*end)
+        if source == target:
+            return [source], 0
+        if grid.is_enemy(target):
+            raise NoPathError("No path found")
+        source_cluster, target_cluster = self.cluster(source), self.cluster(target)
+        for cluster in (source_cluster, target_cluster):
+            if cluster not in self.clusters:
+                self._build(cluster)
+        entrances = set(self.clusters[source_cluster])
+        from_start = [(n, d) for n, d in self._search(source)[0].items() if n in entrances or n == target]
+        # a start on the border may also step straight out of its cluster, to
+        # a cell that need not be an entrance there: it gets legs of its own
+        stepped = {}
+        for neighbor in grid.neighbors(source):
+            cluster = self.cluster(neighbor)
+            if cluster == source_cluster:
+                continue
+            from_start.append((neighbor, 1))
+            if cluster not in self.clusters:
+                self._build(cluster)
+            if neighbor not in self.legs:
+                others = set(self.clusters[cluster])
+                stepped[neighbor] = [(n, d) for n, d in self._search(neighbor)[0].items() if n in others]
+        to_end = self._search(target)[0]
+        if self.labels is not None and not self._may_reach(from_start, stepped, to_end, target, target_cluster):
+            raise NoPathError("No path found")
+
+        # landmark distances to the target, through the entrances it is reached from
+        bounds = self.bounds
+        target_bound = None
+        goal = [(bounds.get(entrance), to_end[entrance]) for entrance in self.clusters[target_cluster]
+                if entrance in to_end]
+        if bounds and goal and all(bound is not None for bound, _ in goal):
+            target_bound = [min(bound[i] + steps for bound, steps in goal) for i in range(len(self.landmarks))]
+            # only the landmarks that bound this query best are consulted
+            start_bounds = [bounds[node] for node, _ in from_start if node in bounds]
+            if start_bounds:
+                gain = [max(abs(target_bound[i] - bound[i]) for bound in start_bounds) for i in range(len(target_bound))]
+                active = sorted(range(len(target_bound)), key=gain.__getitem__, reverse=True)[:ACTIVE_LANDMARKS]
+            else:
+                active = range(len(target_bound))
+            target_bound = [(i, target_bound[i]) for i in active]
+        estimates = {}
+        end_row, end_col = end
+
+        best = {source: 0}
+        parent = {source: None}
+        frontier = [(0, 0, source)]
+        while frontier:
+            _, negative_g, current = heapq.heappop(frontier)
+            g = -negative_g
+            if g > best[current]:
+                continue
+            self.expanded += 1
+            if current == target:
+                nodes = []
+                while current is not None:
+                    nodes.append(current)
+                    current = parent[current]
+                nodes.reverse()
+                return nodes, g
+            if current == source:
+                legs = from_start
+            else:
+                legs = stepped[current] if current in stepped else self._node_legs(current)
+                if current in to_end and self.cluster(current) == target_cluster:
+                    legs = list(legs) + [(target, to_end[current])]
+            for following, cost in legs:
+                distance = g + cost
+                if distance < best.get(following, distance + 1):
+                    best[following] = distance
+                    parent[following] = current
+                    estimate = estimates.get(following)
+                    if estimate is None:
+                        row, col = divmod(following, cols)
+                        estimate = manhattan(abs(row - end_row), abs(col - end_col))
+                        bound = bounds.get(following) if target_bound is not None and following != target else None
+                        if bound is not None:
+                            for i, to_target in target_bound:
+                                if abs(to_target - bound[i]) > estimate:
+                                    estimate = abs(to_target - bound[i])
+                        estimates[following] = estimate
+                    heapq.heappush(frontier, (distance + estimate, -distance, following))
+        if not self.labels_fresh:
+            # enemies split something up; relabel so the next such query is rejected early
+            self._label()
+        raise NoPathError("No path found")
+
+    def _may_reach(self, from_start, stepped, to_end, target, target_cluster):
+        # False only when the labels prove the target out of reach: nothing
+        # the start reaches shares a label with what reaches the target
+        labels = self.labels
+        nodes = [node for node, _ in from_start]
+        for legs in stepped.values():
+            nodes.extend(node for node, _ in legs)
+        seen = set()
+        for node in nodes:
+            if node == target or node in to_end and self.cluster(node) == target_cluster:
+                return True
+            if node in stepped:
+                continue
+            label = labels.get(node)
+            if label is None:
+                return True
+            seen.add(label)
+        for entrance in self.clusters[target_cluster]:
+            if entrance in to_end:
+                label = labels.get(entrance)
+                if label is None or label in seen:
+                    return True
+        return False
+
+    def distance(self, start, end):
+        try:
+            return self.abstract_path(start, end)[1]
+        except NoPathError:
+            return float('inf')
+
+    def iter_path(self, start, end):
+        # cells of the path, each leg refined only when the walk gets there
+        nodes, _ = self.abstract_path(start, end)
+        cols = self.grid.cols
+        yield divmod(nodes[0], cols)
+        for leg_start, leg_end in zip(nodes, nodes[1:]):
+            if self.cluster(leg_start) != self.cluster(leg_end):
+                yield divmod(leg_end, cols)
+                continue
+            _, parent = self._search(leg_start, leg_end)
+            leg = []
+            current = leg_end
+            while current != leg_start:
+                leg.append(divmod(current, cols))
+                current = parent[current]
+            yield from reversed(leg)
+
+    def path(self, start, end):
+        return list(self.iter_path(start, end))
+
+
+def compare_flat(maze, queries, cluster_size=16, exact=False):
+    # per query: flat astar against the hierarchical length query and the
+    # full refined path (its own abstract search included), after prepare()
+    grid = as_grid(maze)
+    planner = HierarchicalPlanner(grid, cluster_size, exact)
+    workspace = SolverWorkspace(grid.size)
+    report = []
+    for start, end in queries:
+        source, target = grid.index(*start), grid.index(*end)
+        started = time.perf_counter()
+        flat_expanded, _ = search(grid, start, end, 'astar', workspace=workspace)
+        flat = time.perf_counter() - started
+        expected = len(workspace.path(source, target, grid.cols)) - 1 if workspace.reached(target) else float('inf')
+        planner.expanded = 0
+        started = time.perf_counter()
+        length = planner.distance(start, end)
+        query = time.perf_counter() - started
+        expanded = planner.expanded
+        started = time.perf_counter()
+        if length != float('inf'):
+            planner.path(start, end)
+        refined = time.perf_counter() - started
+        report.append({'start': start, 'end': end, 'length': expected, 'hpa_length': length,
+                       'flat_ms': 1000 * flat, 'flat_expanded': flat_expanded, 'hpa_ms': 1000 * query,
+                       'path_ms': 1000 * refined, 'abstract_expanded': expanded})
+    return planner, report
+
+
+if __name__ == "__main__":
+    import random
+
+    from maze_generators import generate
+
+    rows = cols = 1000
+    maze = generate('kruskal', rows, cols, num_enemies=rows * cols // 500, num_rewards=0, seed=1, braid=0.3)
+    picker = random.Random(1)
+    queries = [((picker.randrange(rows), 0), (picker.randrange(rows), cols - 1)) for _ in range(8)]
+    planner, report = compare_flat(maze, queries)
+    print("prepare %.1f s, %d entrances, %d landmarks" % (planner.prepare_seconds, len(planner.legs),
+                                                         len(planner.landmarks)))
+    for row in report:
+        print("%-12s -> %-12s length %-6s hpa %-6s flat %8.1f ms  hpa %6.1f ms (%5d expanded)  with path %6.1f ms"
+              % (row['start'], row['end'], row['length'], row['hpa_length'], row['flat_ms'], row['hpa_ms'],
+                 row['abstract_expanded'], row['path_ms']))
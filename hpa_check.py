@@ -0,0 +1,55 @@
+import random
+
+from hpa import HierarchicalPlanner
+from maze_checks import or_none, walkable
+from maze_generators import generate
+from maze_solvers import bfs
+
+
+# Queries a HierarchicalPlanner on seeded mazes and cluster sizes while
+# enemies are added and removed, and checks every answer against BFS. With
+# exact=True lengths must match; with merged entrances paths may be longer
+# and the extra steps are reported. Either way "no path" must agree, the
+# path must be walkable and distance() must match it.
+def compare_hpa(trials=200, max_rows=40, max_cols=40, queries=10, exact=True, seed=0):
+    picker = random.Random(seed)
+    report = {'trials': trials, 'exact': exact, 'solvable': 0, 'mismatches': [], 'bad_paths': [],
+              'steps': 0, 'extra_steps': 0}
+
+    for trial in range(trials):
+        rows, cols = picker.randint(1, max_rows), picker.randint(1, max_cols)
+        if trial % 2:
+            grid = generate('kruskal', rows, cols, num_enemies=picker.randint(0, rows * cols // 10), num_rewards=0,
+                            seed=seed + trial, braid=0.4)
+        else:
+            grid = generate('random', rows, cols, num_enemies=picker.randint(0, rows * cols // 10), num_rewards=0,
+                            seed=seed + trial, open_probability=0.65)
+        planner = HierarchicalPlanner(grid, picker.randint(2, 9), exact=exact)
+        for query in range(queries):
+            if query == queries // 2:
+                for _ in range(5):
+                    planner.set_enemy(picker.randrange(rows), picker.randrange(cols), picker.random() < 0.7)
+            start = (picker.randrange(rows), picker.randrange(cols))
+            end = (picker.randrange(rows), picker.randrange(cols))
+            shortest = or_none(bfs, grid, start, end)
+            path = or_none(planner.path, start, end)
+            expected = None if shortest is None else len(shortest) - 1
+            found = None if path is None else len(path) - 1
+            if (found is None) != (expected is None) or (exact and found != expected):
+                report['mismatches'].append((seed + trial, query, start, end, expected, found))
+            elif path is not None:
+                report['solvable'] += 1
+                report['steps'] += expected
+                report['extra_steps'] += found - expected
+                if not walkable(grid, path, start, end) or planner.distance(start, end) != found:
+                    report['bad_paths'].append((seed + trial, query, start, end))
+
+    return report
+
+
+if __name__ == "__main__":
+    for exact in (True, False):
+        result = compare_hpa(exact=exact)
+        print("exact" if exact else "merged", "solvable:", result['solvable'],
+              "wrong answers:", len(result['mismatches']), "bad paths:", len(result['bad_paths']),
+              "extra steps: %.2f%%" % (100 * result['extra_steps'] / max(result['steps'], 1)))
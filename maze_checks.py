@@ -0,0 +1,25 @@
+from maze_solvers import NoPathError
+
+
+# Helpers shared by the *_check.py scripts that test solvers against an oracle.
+
+def or_none(solver, *args, **keywords):
+    # solver(*args, **keywords), or None when it finds no path
+    try:
+        return solver(*args, **keywords)
+    except NoPathError:
+        return None
+
+
+def walkable(grid, path, start, end):
+    # path goes from start to end and every step is an open, enemy free move
+    if path is None or path[0] != start or path[-1] != end:
+        return False
+    return all(grid.index(*b) in grid.neighbors(grid.index(*a)) for a, b in zip(path, path[1:]))
+
+
+def path_length(workspace, source, target, cols):
+    # steps of the path a search left in workspace, None when target was not reached
+    if not workspace.reached(target):
+        return None
+    return len(workspace.path(source, target, cols)) - 1
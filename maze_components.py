@@ -0,0 +1,80 @@
+import random
+from array import array
+
+from maze_grid import RIGHT, DOWN
+
+
+class DisjointSet:
+    # Union-find over cell indices. Generators union every wall they open,
+    # so "are these two cells connected (ignoring enemies)?" is answered
+    # without searching.
+    def __init__(self, size=0, parent=None):
+        self.parent = parent if parent is not None else array('i', range(size))
+
+    def find(self, index):
+        parent = self.parent
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return False
+        # the smaller index stays root, same rule as the vectorized labelling
+        if root_a < root_b:
+            self.parent[root_b] = root_a
+        else:
+            self.parent[root_a] = root_b
+        return True
+
+    def connected(self, a, b):
+        return self.find(a) == self.find(b)
+
+    def compress(self):
+        # point every cell straight at its root so find() is a single lookup.
+        # Roots are the smallest index of their set and parents always sit
+        # below their children, so one pass in index order is enough.
+        parent = self.parent
+        for index in range(len(parent)):
+            parent[index] = parent[parent[index]]
+        return self
+
+
+def union_walls(grid):
+    # pure python labelling for grids that were not built by a generator
+    components = DisjointSet(grid.size)
+    walls, cols = grid.walls, grid.cols
+    for index in range(grid.size):
+        if not walls[index] & RIGHT:
+            components.union(index, index + 1)
+        if not walls[index] & DOWN and index + cols < grid.size:
+            components.union(index, index + cols)
+    return components.compress()
+
+
+def start_candidates(rows, cols):
+    # same cells generate_start_on_border picks from
+    return [(row, 0) for row in range(1, rows - 1)]
+
+
+def end_candidates(rows, cols):
+    # same cells generate_end_on_border can return for a start on the left side
+    cells = [(0, col) for col in range(1, cols - 1)]
+    cells += [(rows - 1, col) for col in range(1, cols - 1)]
+    cells += [(row, cols - 1) for row in range(1, rows - 1)]
+    return cells
+
+
+def pick_start(component_of, rows, cols, rng=random):
+    # a start whose component reaches at least one end cell, or None
+    reachable = set(component_of(row, col) for row, col in end_candidates(rows, cols))
+    starts = [cell for cell in start_candidates(rows, cols) if component_of(*cell) in reachable]
+    return rng.choice(starts) if starts else None
+
+
+def pick_end(component_of, rows, cols, start, rng=random):
+    label = component_of(*start)
+    ends = [cell for cell in end_candidates(rows, cols) if cell != start and component_of(*cell) == label]
+    return rng.choice(ends) if ends else None
@@ -0,0 +1,167 @@
+import mmap
+import struct
+
+import numpy as np
+
+from maze_grid import as_grid, MazeGrid, LEFT, RIGHT, UP, DOWN
+
+# File layout, all little endian:
+#   header   magic, version, flags, rows, cols, seed, start row/col, end row/col
+#            (-1 for anything unknown), padded to HEADER_SIZE
+#   walls    one wall mask byte per cell, row major, the same bytes as
+#            MazeGrid.walls so a mapped file backs a grid without decoding;
+#            with PACKED_WALLS instead two bit planes (right walls, down walls)
+#   enemy    bit plane, (cells + 7) // 8 bytes
+#   reward   bit plane, (cells + 7) // 8 bytes
+MAGIC = b'MAZE'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIqiiii')
+HEADER_SIZE = 64
+
+# flags
+PACKED_WALLS = 1
+
+
+def save(maze, file_name, start=None, end=None, seed=None, packed=False):
+    # packed files are four times smaller but have to be decoded on load
+    grid = as_grid(maze)
+    size = grid.size
+    with open(file_name, 'wb') as out:
+        out.write(_header(grid.rows, grid.cols, seed if seed is not None else grid.seed, start, end,
+                          PACKED_WALLS if packed else 0))
+        if packed:
+            walls = np.frombuffer(bytes(grid.walls), dtype=np.uint8)
+            for side in (RIGHT, DOWN):
+                out.write(np.packbits((walls & side) != 0, bitorder='little').tobytes())
+        else:
+            out.write(grid.walls)
+        plane = (size + 7) // 8
+        out.write(bytes(grid.enemy[:plane]))
+        out.write(bytes(grid.reward[:plane]))
+
+
+def write_rows(file_name, rows, cols, row_iter, seed=None, start=None, end=None):
+    # Streams (walls, enemy, reward) rows, e.g. from maze_stream.eller_rows,
+    # into a file. Walls go straight to disk; only the two bit planes, an
+    # eighth of a byte per cell, are held until the end.
+    plane = (rows * cols + 7) // 8
+    enemy = bytearray(plane)
+    reward = bytearray(plane)
+    written = 0
+    with open(file_name, 'wb') as out:
+        out.write(_header(rows, cols, seed, start, end, 0))
+        for row, (walls, row_enemy, row_reward) in enumerate(row_iter):
+            out.write(walls)
+            base = row * cols
+            for source, target in ((row_enemy, enemy), (row_reward, reward)):
+                for col in _set_bits(source, cols):
+                    index = base + col
+                    target[index >> 3] |= 1 << (index & 7)
+            written += 1
+        if written != rows:
+            raise ValueError("Expected %d rows, got %d" % (rows, written))
+        out.write(enemy)
+        out.write(reward)
+
+
+def load(file_name):
+    # Maps the file copy-on-write and returns (grid, start, end). The grid's
+    # planes are memoryviews into the mapping, so opening costs nothing per
+    # cell and the OS pages in only the rows a solver actually reads. Changes
+    # to the grid (new enemies, opened walls) stay private to this process.
+    with open(file_name, 'rb') as source:
+        mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_COPY)
+    rows, cols, seed, start, end, flags = _read_header(mapped)
+    size = rows * cols
+    plane = (size + 7) // 8
+    view = memoryview(mapped)
+    offset = HEADER_SIZE
+    if flags & PACKED_WALLS:
+        walls = _unpack_walls(view[offset:offset + 2 * plane], rows, cols)
+        offset += 2 * plane
+    else:
+        walls = view[offset:offset + size]
+        offset += size
+    if len(view) < offset + 2 * plane:
+        raise ValueError("Truncated maze file %s" % file_name)
+    enemy = view[offset:offset + plane]
+    reward = view[offset + plane:offset + 2 * plane]
+    return MazeGrid(rows, cols, walls, enemy, reward, seed=seed), start, end
+
+
+def load_nodes(file_name):
+    # the same file as the list of lists of MazeNode generate_random_maze returns
+    grid, start, end = load(file_name)
+    return to_nodes(grid), start, end
+
+
+def to_nodes(grid):
+    from maze_with_enemies import MazeNode
+
+    rows, cols = grid.rows, grid.cols
+    walls = grid.walls
+    maze = [[MazeNode(row, col) for col in range(cols)] for row in range(rows)]
+    index = 0
+    for row in range(rows):
+        for col in range(cols):
+            node = maze[row][col]
+            mask = walls[index]
+            if not mask & RIGHT:
+                node.right = maze[row][col + 1]
+                maze[row][col + 1].left = node
+            if not mask & DOWN:
+                node.down = maze[row + 1][col]
+                maze[row + 1][col].up = node
+            node.is_enemy = grid.is_enemy(index)
+            node.is_reward = grid.is_reward(index)
+            index += 1
+    return maze
+
+
+def _header(rows, cols, seed, start, end, flags):
+    start = start if start is not None else (-1, -1)
+    end = end if end is not None else (-1, -1)
+    header = HEADER.pack(MAGIC, VERSION, flags, rows, cols, -1 if seed is None else seed,
+                         start[0], start[1], end[0], end[1])
+    return header.ljust(HEADER_SIZE, b'\0')
+
+
+def _read_header(data):
+    if len(data) < HEADER_SIZE:
+        raise ValueError("Not a maze file")
+    magic, version, flags, rows, cols, seed, start_row, start_col, end_row, end_col = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a maze file")
+    if version > VERSION:
+        raise ValueError("Maze file version %d is newer than this reader (%d)" % (version, VERSION))
+    start = (start_row, start_col) if start_row >= 0 else None
+    end = (end_row, end_col) if end_row >= 0 else None
+    return rows, cols, (seed if seed >= 0 else None), start, end, flags
+
+
+def _unpack_walls(data, rows, cols):
+    # rebuild all four sides from the right and down planes; the left wall of
+    # a cell is the right wall of its neighbour, the outer border is closed
+    size = rows * cols
+    plane = len(data) // 2
+    right = np.unpackbits(np.frombuffer(data[:plane], dtype=np.uint8), bitorder='little')[:size]
+    down = np.unpackbits(np.frombuffer(data[plane:], dtype=np.uint8), bitorder='little')[:size]
+    right = right.reshape(rows, cols).astype(bool)
+    down = down.reshape(rows, cols).astype(bool)
+    walls = np.where(right, RIGHT, 0) | np.where(down, DOWN, 0)
+    left = np.ones((rows, cols), dtype=bool)
+    left[:, 1:] = right[:, :-1]
+    up = np.ones((rows, cols), dtype=bool)
+    up[1:] = down[:-1]
+    walls |= np.where(left, LEFT, 0) | np.where(up, UP, 0)
+    return bytearray(walls.astype(np.uint8).tobytes())
+
+
+def _set_bits(plane, count):
+    for byte_index, byte in enumerate(plane):
+        while byte:
+            low = byte & -byte
+            bit = (byte_index << 3) + low.bit_length() - 1
+            if bit < count:
+                yield bit
+            byte ^= low
@@ -0,0 +1,215 @@
+import random
+import time
+from array import array
+
+import numpy as np
+
+from maze_components import DisjointSet
+from maze_grid import MazeGrid, LEFT, RIGHT, UP, DOWN, ALL_WALLS
+from search_stats import phase
+
+
+def generate_random_grid(rows, cols, num_enemies=10, num_rewards=5, seed=None, open_probability=0.5, stats=None):
+    # Same model as generate_random_maze: every right and down wall is opened
+    # with probability 1/2, but all coin flips are drawn in one batch.
+    rng = np.random.default_rng(seed)
+    with phase(stats, 'carve'):
+        walls = np.full((rows, cols), ALL_WALLS, dtype=np.uint8)
+
+        open_right = rng.random((rows, cols - 1)) < open_probability
+        walls[:, :-1][open_right] &= ~RIGHT & ALL_WALLS
+        walls[:, 1:][open_right] &= ~LEFT & ALL_WALLS
+
+        open_down = rng.random((rows - 1, cols)) < open_probability
+        walls[:-1, :][open_down] &= ~DOWN & ALL_WALLS
+        walls[1:, :][open_down] &= ~UP & ALL_WALLS
+
+        grid = MazeGrid(rows, cols, walls=bytearray(walls.tobytes()), seed=seed)
+    with phase(stats, 'components'):
+        grid.components = label_components(grid.walls, rows, cols)
+    with phase(stats, 'items'):
+        place_items(grid, num_enemies, num_rewards, rng)
+    if stats is not None:
+        stats.rows += rows
+    return grid
+
+
+def generate_kruskal(rows, cols, num_enemies=10, num_rewards=5, seed=None, braid=0.0, stats=None):
+    # randomized Kruskal: open walls in random order unless they would close a loop
+    carver = random.Random(seed)
+    grid = MazeGrid(rows, cols, seed=seed)
+    components = DisjointSet(grid.size)
+    with phase(stats, 'carve'):
+        edges = [(index, side) for index in range(grid.size) for side, _ in _sides(index, rows, cols)
+                 if side in (RIGHT, DOWN)]
+        carver.shuffle(edges)
+        for index, side in edges:
+            other = index + 1 if side == RIGHT else index + cols
+            if components.union(index, other):
+                grid.open_wall(index, side)
+    return _finish(grid, carver, braid, num_enemies, num_rewards, seed, stats)
+
+
+def generate_wilson(rows, cols, num_enemies=10, num_rewards=5, seed=None, braid=0.0, stats=None):
+    # Wilson's algorithm: loop-erased random walks give a uniform spanning tree
+    carver = random.Random(seed)
+    grid = MazeGrid(rows, cols, seed=seed)
+    size = grid.size
+    in_tree = bytearray(size)
+    in_tree[carver.randrange(size)] = 1
+    # the last direction taken out of each cell, overwriting it erases loops
+    exit_side = bytearray(size)
+
+    with phase(stats, 'carve'):
+        for walk_start in range(size):
+            if in_tree[walk_start]:
+                continue
+            current = walk_start
+            while not in_tree[current]:
+                side, other = carver.choice(_sides(current, rows, cols))
+                exit_side[current] = side
+                current = other
+            current = walk_start
+            while not in_tree[current]:
+                in_tree[current] = 1
+                side = exit_side[current]
+                grid.open_wall(current, side)
+                current = grid._across(current, side)
+    return _finish(grid, carver, braid, num_enemies, num_rewards, seed, stats)
+
+
+def generate_backtracker(rows, cols, num_enemies=10, num_rewards=5, seed=None, braid=0.0, stats=None):
+    # depth first recursive backtracker, with an explicit stack instead of recursion
+    carver = random.Random(seed)
+    grid = MazeGrid(rows, cols, seed=seed)
+    with phase(stats, 'carve'):
+        visited = bytearray(grid.size)
+        start = carver.randrange(grid.size)
+        visited[start] = 1
+        stack = [start]
+        while stack:
+            current = stack[-1]
+            options = [(side, other) for side, other in _sides(current, rows, cols) if not visited[other]]
+            if not options:
+                stack.pop()
+                continue
+            side, other = carver.choice(options)
+            grid.open_wall(current, side)
+            visited[other] = 1
+            stack.append(other)
+    return _finish(grid, carver, braid, num_enemies, num_rewards, seed, stats)
+
+
+def _sides(index, rows, cols):
+    row, col = divmod(index, cols)
+    sides = []
+    if col > 0:
+        sides.append((LEFT, index - 1))
+    if col < cols - 1:
+        sides.append((RIGHT, index + 1))
+    if row > 0:
+        sides.append((UP, index - cols))
+    if row < rows - 1:
+        sides.append((DOWN, index + cols))
+    return sides
+
+
+def _finish(grid, carver, braid, num_enemies, num_rewards, seed, stats=None):
+    # a spanning tree joins every cell, so there is a single component
+    grid.components = DisjointSet(parent=array('i', [0]) * grid.size)
+    if braid:
+        with phase(stats, 'braid'):
+            braid_dead_ends(grid, braid, carver)
+    with phase(stats, 'items'):
+        place_items(grid, num_enemies, num_rewards, np.random.default_rng(seed))
+    if stats is not None:
+        stats.rows += grid.rows
+    return grid
+
+
+def braid_dead_ends(grid, braid, carver=random):
+    # Knock one extra wall out of a share of the dead ends, so enemies on a
+    # corridor leave another way round. Joining two dead ends is preferred.
+    rows, cols, walls = grid.rows, grid.cols, grid.walls
+    dead_ends = [index for index in range(grid.size) if len(grid.open_neighbors(index)) == 1]
+    carver.shuffle(dead_ends)
+    for index in dead_ends:
+        if len(grid.open_neighbors(index)) != 1 or carver.random() >= braid:
+            continue
+        closed = [(side, other) for side, other in _sides(index, rows, cols) if walls[index] & side]
+        if not closed:
+            continue
+        best = [(side, other) for side, other in closed if len(grid.open_neighbors(other)) == 1]
+        side, _ = carver.choice(best or closed)
+        grid.open_wall(index, side)
+
+
+GENERATORS = {
+    'random': generate_random_grid,
+    'kruskal': generate_kruskal,
+    'wilson': generate_wilson,
+    'backtracker': generate_backtracker,
+}
+
+
+def generate(name, rows, cols, **options):
+    return GENERATORS[name](rows, cols, **options)
+
+
+def timed_generate(name, rows, cols, **options):
+    # returns the grid and how many cells per second the generator managed
+    started = time.perf_counter()
+    grid = generate(name, rows, cols, **options)
+    elapsed = time.perf_counter() - started
+    return grid, (rows * cols / elapsed if elapsed else float('inf'))
+
+
+def place_items(grid, num_enemies, num_rewards, rng):
+    # one sample without replacement, so enemies and rewards never collide
+    size = grid.size
+    if num_enemies + num_rewards > size:
+        raise ValueError("Not enough cells for %d enemies and %d rewards" % (num_enemies, num_rewards))
+    cells = rng.choice(size, num_enemies + num_rewards, replace=False)
+    grid.enemy[:] = _plane(cells[:num_enemies], size)
+    grid.reward[:] = _plane(cells[num_enemies:], size)
+
+
+def _plane(cells, size):
+    flags = np.zeros(size, dtype=bool)
+    flags[cells] = True
+    return np.packbits(flags, bitorder='little').tobytes()
+
+
+def label_components(walls, rows, cols):
+    # Connected components of a wall mask array in a few numpy passes:
+    # hook each root onto the smallest root across an open wall, then
+    # pointer-jump until every cell points at its root.
+    mask = np.frombuffer(bytes(walls), dtype=np.uint8).reshape(rows, cols)
+    index = np.arange(rows * cols, dtype=np.int64).reshape(rows, cols)
+    right = (mask[:, :-1] & RIGHT) == 0
+    down = (mask[:-1, :] & DOWN) == 0
+    a = np.concatenate([index[:, :-1][right], index[:-1, :][down]])
+    b = np.concatenate([index[:, 1:][right], index[1:, :][down]])
+
+    parent = np.arange(rows * cols, dtype=np.int64)
+    while True:
+        root_a, root_b = parent[a], parent[b]
+        pending = root_a != root_b
+        if not pending.any():
+            break
+        low = np.minimum(root_a, root_b)[pending]
+        high = np.maximum(root_a, root_b)[pending]
+        np.minimum.at(parent, high, low)
+        while True:
+            jumped = parent[parent]
+            if (jumped == parent).all():
+                break
+            parent = jumped
+
+    return DisjointSet(parent=array('i', parent.astype(np.int32).tobytes()))
+
+
+if __name__ == "__main__":
+    for name in GENERATORS:
+        _, rate = timed_generate(name, 200, 200, seed=1)
+        print("%-12s %12.0f cells/s" % (name, rate))
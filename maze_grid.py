@@ -0,0 +1,309 @@
+# wall bits, a set bit means the wall is there (no passage)
+LEFT = 1
+RIGHT = 2
+UP = 4
+DOWN = 8
+ALL_WALLS = LEFT | RIGHT | UP | DOWN
+
+OPPOSITE = {LEFT: RIGHT, RIGHT: LEFT, UP: DOWN, DOWN: UP}
+
+
+class MazeGrid:
+    # Flat, array backed maze. walls holds one 4 bit mask per cell, enemy and
+    # reward are bit planes (one bit per cell, 8 cells per byte). Cells are
+    # addressed by index = row * cols + col.
+    def __init__(self, rows, cols, walls=None, enemy=None, reward=None, seed=None):
+        self.rows = rows
+        self.cols = cols
+        self.seed = seed
+        size = rows * cols
+        plane = (size + 7) // 8
+        self.walls = walls if walls is not None else bytearray([ALL_WALLS]) * size
+        self.enemy = enemy if enemy is not None else bytearray(plane)
+        self.reward = reward if reward is not None else bytearray(plane)
+        # DisjointSet of connected cells (walls only), kept up to date by open_wall
+        self.components = None
+        self._build_steps()
+        # only allocated when old style code writes node.distance / node.visited
+        self._distance = None
+        self._visited = None
+
+    def _build_steps(self):
+        # for every wall mask, the index offsets of the open sides
+        cols = self.cols
+        steps = []
+        for mask in range(16):
+            open_steps = []
+            if not mask & LEFT:
+                open_steps.append(-1)
+            if not mask & RIGHT:
+                open_steps.append(1)
+            if not mask & UP:
+                open_steps.append(-cols)
+            if not mask & DOWN:
+                open_steps.append(cols)
+            steps.append(tuple(open_steps))
+        self._steps = steps
+
+    @property
+    def size(self):
+        return self.rows * self.cols
+
+    def index(self, row, col):
+        return row * self.cols + col
+
+    def cell(self, index):
+        return divmod(index, self.cols)
+
+    # passages
+
+    def is_open(self, index, side):
+        return not self.walls[index] & side
+
+    def open_wall(self, index, side):
+        other = self._across(index, side)
+        self.walls[index] &= ~side & ALL_WALLS
+        self.walls[other] &= ~OPPOSITE[side] & ALL_WALLS
+        if self.components is not None:
+            self.components.union(index, other)
+
+    def close_wall(self, index, side):
+        other = self._across(index, side)
+        self.walls[index] |= side
+        self.walls[other] |= OPPOSITE[side]
+        # union-find cannot split a set, rebuild on the next query
+        self.components = None
+
+    def _across(self, index, side):
+        row, col = divmod(index, self.cols)
+        if side == LEFT and col > 0:
+            return index - 1
+        if side == RIGHT and col < self.cols - 1:
+            return index + 1
+        if side == UP and row > 0:
+            return index - self.cols
+        if side == DOWN and row < self.rows - 1:
+            return index + self.cols
+        raise ValueError("No cell on that side of (%d, %d)" % (row, col))
+
+    def open_neighbors(self, index):
+        return [index + step for step in self._steps[self.walls[index]]]
+
+    def neighbors(self, index):
+        # neighbours a solver may step into: open passage and not an enemy
+        enemy = self.enemy
+        return [j for j in (index + step for step in self._steps[self.walls[index]])
+                if not enemy[j >> 3] >> (j & 7) & 1]
+
+    def component(self, index):
+        if self.components is None:
+            from maze_components import union_walls
+            self.components = union_walls(self)
+        return self.components.find(index)
+
+    def connected(self, start, end):
+        # are the two cells joined by open passages, ignoring enemies
+        return self.component(self.index(*start)) == self.component(self.index(*end))
+
+    # enemy / reward planes
+
+    def is_enemy(self, index):
+        return bool(self.enemy[index >> 3] >> (index & 7) & 1)
+
+    def set_enemy(self, index, value=True):
+        _set_bit(self.enemy, index, value)
+
+    def is_reward(self, index):
+        return bool(self.reward[index >> 3] >> (index & 7) & 1)
+
+    def set_reward(self, index, value=True):
+        _set_bit(self.reward, index, value)
+
+    def enemies(self):
+        return [self.cell(i) for i in _bit_indices(self.enemy, self.size)]
+
+    def rewards(self):
+        return [self.cell(i) for i in _bit_indices(self.reward, self.size)]
+
+    # maze[row][col] access for code written against MazeNode
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += self.rows
+        if not 0 <= row < self.rows:
+            raise IndexError("maze row out of range")
+        return GridRow(self, row)
+
+    def __iter__(self):
+        for row in range(self.rows):
+            yield GridRow(self, row)
+
+    def _distances(self):
+        if self._distance is None:
+            self._distance = [float('inf')] * self.size
+            self._visited = bytearray(self.size)
+        return self._distance
+
+    @classmethod
+    def from_nodes(cls, maze):
+        # build a grid from the list of lists of MazeNode objects
+        rows, cols = len(maze), len(maze[0])
+        grid = cls(rows, cols)
+        walls = grid.walls
+        index = 0
+        for row in maze:
+            for node in row:
+                mask = 0
+                if node.left is None:
+                    mask |= LEFT
+                if node.right is None:
+                    mask |= RIGHT
+                if node.up is None:
+                    mask |= UP
+                if node.down is None:
+                    mask |= DOWN
+                walls[index] = mask
+                if node.is_enemy:
+                    grid.set_enemy(index)
+                if node.is_reward:
+                    grid.set_reward(index)
+                index += 1
+        return grid
+
+    def copy(self):
+        return MazeGrid(self.rows, self.cols, bytearray(self.walls), bytearray(self.enemy),
+                        bytearray(self.reward), seed=self.seed)
+
+
+class GridRow:
+    def __init__(self, grid, row):
+        self.grid = grid
+        self.row = row
+
+    def __len__(self):
+        return self.grid.cols
+
+    def __getitem__(self, col):
+        cols = self.grid.cols
+        if col < 0:
+            col += cols
+        if not 0 <= col < cols:
+            raise IndexError("maze column out of range")
+        return GridCell(self.grid, self.row * cols + col)
+
+    def __iter__(self):
+        start = self.row * self.grid.cols
+        for index in range(start, start + self.grid.cols):
+            yield GridCell(self.grid, index)
+
+
+class GridCell:
+    # Light view of one grid cell that behaves like a MazeNode.
+    __slots__ = ('grid', 'index')
+
+    def __init__(self, grid, index):
+        self.grid = grid
+        self.index = index
+
+    @property
+    def row(self):
+        return self.index // self.grid.cols
+
+    @property
+    def col(self):
+        return self.index % self.grid.cols
+
+    def _side(self, side):
+        grid = self.grid
+        if grid.walls[self.index] & side:
+            return None
+        return GridCell(grid, grid._across(self.index, side))
+
+    def _link(self, side, other):
+        if other is None:
+            self.grid.close_wall(self.index, side)
+        else:
+            self.grid.open_wall(self.index, side)
+
+    left = property(lambda self: self._side(LEFT), lambda self, other: self._link(LEFT, other))
+    right = property(lambda self: self._side(RIGHT), lambda self, other: self._link(RIGHT, other))
+    up = property(lambda self: self._side(UP), lambda self, other: self._link(UP, other))
+    down = property(lambda self: self._side(DOWN), lambda self, other: self._link(DOWN, other))
+
+    @property
+    def is_enemy(self):
+        return self.grid.is_enemy(self.index)
+
+    @is_enemy.setter
+    def is_enemy(self, value):
+        self.grid.set_enemy(self.index, value)
+
+    @property
+    def is_reward(self):
+        return self.grid.is_reward(self.index)
+
+    @is_reward.setter
+    def is_reward(self, value):
+        self.grid.set_reward(self.index, value)
+
+    @property
+    def component(self):
+        return self.grid.component(self.index)
+
+    @property
+    def distance(self):
+        return self.grid._distances()[self.index]
+
+    @distance.setter
+    def distance(self, value):
+        self.grid._distances()[self.index] = value
+
+    @property
+    def visited(self):
+        self.grid._distances()
+        return bool(self.grid._visited[self.index])
+
+    @visited.setter
+    def visited(self, value):
+        self.grid._distances()
+        self.grid._visited[self.index] = 1 if value else 0
+
+    def __eq__(self, other):
+        return isinstance(other, GridCell) and other.grid is self.grid and other.index == self.index
+
+    def __hash__(self):
+        return hash((id(self.grid), self.index))
+
+    def __lt__(self, other):
+        return self.distance < other.distance
+
+    def __repr__(self):
+        return "GridCell(%d, %d)" % (self.row, self.col)
+
+
+def _set_bit(plane, index, value):
+    if value:
+        plane[index >> 3] |= 1 << (index & 7)
+    else:
+        plane[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+
+def _bit_indices(plane, size):
+    found = []
+    for byte_index, byte in enumerate(plane):
+        if byte:
+            base = byte_index << 3
+            for bit in range(8):
+                if byte >> bit & 1 and base + bit < size:
+                    found.append(base + bit)
+    return found
+
+
+def as_grid(maze):
+    # solvers accept either a MazeGrid or the old list of lists of MazeNode
+    if isinstance(maze, list):
+        return MazeGrid.from_nodes(maze)
+    return maze
@@ -0,0 +1,118 @@
+# step directions, a run byte is code | (steps - 1) << 2
+STEPS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+STEP_CODES = {step: code for code, step in enumerate(STEPS)}
+MAX_RUN = 64
+
+
+class Path:
+    # A path of (row, col) cells stored as its start cell and run length
+    # encoded steps, one byte per run of up to MAX_RUN steps in the same
+    # direction: corridors of any length cost a byte or two instead of a
+    # tuple per cell. Paths are immutable. Cells are produced lazily when
+    # iterated, len() is O(1), and membership / intersection go through a
+    # set of the cells that is built on first use.
+    __slots__ = ('start', 'end', 'runs', '_length', '_cells')
+
+    def __init__(self, start, runs=b'', length=None):
+        self.start = tuple(start)
+        self.runs = bytes(runs)
+        row, col = self.start
+        steps = 0
+        for byte in self.runs:
+            count = (byte >> 2) + 1
+            row_step, col_step = STEPS[byte & 3]
+            row += row_step * count
+            col += col_step * count
+            steps += count
+        if length is not None and length != steps + 1:
+            raise ValueError("Runs cover %d cells, not %d" % (steps + 1, length))
+        self.end = (row, col)
+        self._length = steps + 1
+        self._cells = None
+
+    @classmethod
+    def from_cells(cls, cells):
+        iterator = iter(cells)
+        try:
+            previous = tuple(next(iterator))
+        except StopIteration:
+            raise ValueError("A path needs at least one cell")
+        start = previous
+        runs = bytearray()
+        code, count = None, 0
+        for cell in iterator:
+            current = STEP_CODES.get((cell[0] - previous[0], cell[1] - previous[1]))
+            if current is None:
+                raise ValueError("%s and %s are not neighbouring cells" % (previous, tuple(cell)))
+            if current == code and count < MAX_RUN:
+                count += 1
+            else:
+                if count:
+                    runs.append(code | (count - 1) << 2)
+                code, count = current, 1
+            previous = cell
+        if count:
+            runs.append(code | (count - 1) << 2)
+        return cls(start, runs)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        row, col = self.start
+        yield (row, col)
+        for byte in self.runs:
+            row_step, col_step = STEPS[byte & 3]
+            for _ in range((byte >> 2) + 1):
+                row += row_step
+                col += col_step
+                yield (row, col)
+
+    def __getitem__(self, index):
+        # one cell is found by skipping whole runs; slices come back as lists
+        if isinstance(index, slice):
+            return self.to_list()[index]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("Path index out of range")
+        row, col = self.start
+        for byte in self.runs:
+            if not index:
+                break
+            count = min((byte >> 2) + 1, index)
+            row_step, col_step = STEPS[byte & 3]
+            row += row_step * count
+            col += col_step * count
+            index -= count
+        return (row, col)
+
+    def cells(self):
+        if self._cells is None:
+            self._cells = frozenset(self)
+        return self._cells
+
+    def __contains__(self, cell):
+        return tuple(cell) in self.cells()
+
+    def intersection(self, cells):
+        # the cells of the path that are also in cells, e.g. rewards or enemies
+        return self.cells().intersection(cells)
+
+    def isdisjoint(self, cells):
+        return self.cells().isdisjoint(cells)
+
+    def to_list(self):
+        # the list of (row, col) tuples the solvers and renderers use
+        return list(self)
+
+    def __eq__(self, other):
+        if not isinstance(other, Path):
+            return NotImplemented
+        return self.start == other.start and self.runs == other.runs
+
+    def __hash__(self):
+        return hash((self.start, self.runs))
+
+    def __repr__(self):
+        return "Path(start=%s, end=%s, length=%d, runs=%d)" % (self.start, self.end, self._length, len(self.runs))
@@ -0,0 +1,104 @@
+import struct
+import zlib
+
+import numpy as np
+
+from maze_grid import as_grid, LEFT, RIGHT, UP, DOWN
+
+# palette indices, colours follow visualize_maze_svg
+BACKGROUND, WALL, ORIGINAL_PATH, NEW_PATH, ENEMY, REWARD, COLLECTED, START, END = range(9)
+PALETTE = bytes([
+    255, 255, 255,
+    0, 0, 0,
+    0, 0, 255,
+    0, 255, 0,
+    120, 0, 120,
+    255, 255, 0,
+    128, 0, 128,
+    255, 0, 0,
+    0, 160, 0,
+])
+
+
+def export_png(maze, original_path, new_path, start, end, rewards, enemies, file_name='maze.png', cell_size=4,
+               compress_level=1):
+    # Paints the maze into a palette image with numpy slicing, one operation
+    # per layer rather than one per wall, and encodes the PNG with zlib.
+    grid = as_grid(maze)
+    image = paint(grid, original_path, new_path, start, end, rewards, cell_size)
+    with open(file_name, 'wb') as out:
+        out.write(encode_png(image, compress_level))
+
+
+def paint(grid, original_path, new_path, start, end, rewards, cell_size=4):
+    rows, cols, size = grid.rows, grid.cols, cell_size
+    walls = np.frombuffer(bytes(grid.walls), dtype=np.uint8).reshape(rows, cols)
+    image = np.full((rows * size + 1, cols * size + 1), BACKGROUND, dtype=np.uint8)
+
+    # cell interiors, as a (rows, cols, size-1, size-1) view into the image
+    cells = image[:-1, :-1].reshape(rows, size, cols, size)[:, 1:, :, 1:].transpose(0, 2, 1, 3)
+    cells[_plane(grid.reward, rows, cols)] = REWARD
+    cells[_plane(grid.enemy, rows, cols)] = ENEMY
+    marks = np.zeros((rows, cols), dtype=bool)
+    for row, col in rewards:
+        marks[row, col] = True
+    cells[marks] = COLLECTED
+
+    # grid line k is closed where the cell on either side of it has a wall
+    across = np.zeros((rows + 1, cols), dtype=bool)
+    across[:-1] |= (walls & UP) != 0
+    across[1:] |= (walls & DOWN) != 0
+    down = np.zeros((rows, cols + 1), dtype=bool)
+    down[:, :-1] |= (walls & LEFT) != 0
+    down[:, 1:] |= (walls & RIGHT) != 0
+
+    lines = np.zeros((rows + 1, cols * size + 1), dtype=bool)
+    lines[:, :-1] = np.repeat(across, size, axis=1)
+    lines[:, size::size] |= across
+    image[::size][lines] = WALL
+    lines = np.zeros((rows * size + 1, cols + 1), dtype=bool)
+    lines[:-1, :] = np.repeat(down, size, axis=0)
+    lines[size::size, :] |= down
+    image[:, ::size][lines] = WALL
+
+    for path, colour in ((original_path, ORIGINAL_PATH), (new_path, NEW_PATH)):
+        if path and len(path) > 1:
+            _draw_route(image, np.asarray(path), size, colour)
+
+    cells[start[0], start[1]] = START
+    cells[end[0], end[1]] = END
+    return image
+
+
+def _plane(plane, rows, cols):
+    flags = np.unpackbits(np.frombuffer(bytes(plane), dtype=np.uint8), bitorder='little')
+    return flags[:rows * cols].reshape(rows, cols).astype(bool)
+
+
+def _draw_route(image, path, size, colour):
+    # every step is a straight run of size + 1 pixels between cell centres
+    centres = path * size + size // 2
+    steps = np.sign(path[1:] - path[:-1])
+    along = np.arange(size + 1)
+    ys = centres[:-1, 0, None] + steps[:, 0, None] * along
+    xs = centres[:-1, 1, None] + steps[:, 1, None] * along
+    width = max(1, size // 4)
+    for offset in range(-(width // 2), width - width // 2):
+        # thicken across the direction of travel
+        image[ys + steps[:, 1, None] * offset, xs + steps[:, 0, None] * offset] = colour
+
+
+def encode_png(image, compress_level=1):
+    height, width = image.shape
+    # each scanline starts with filter type 0 (none)
+    raw = np.zeros((height, width + 1), dtype=np.uint8)
+    raw[:, 1:] = image
+    return (b'\x89PNG\r\n\x1a\n'
+            + _chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 3, 0, 0, 0))
+            + _chunk(b'PLTE', PALETTE)
+            + _chunk(b'IDAT', zlib.compress(raw.tobytes(), compress_level))
+            + _chunk(b'IEND', b''))
+
+
+def _chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF)
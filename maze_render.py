@@ -0,0 +1,130 @@
+import re
+import time
+
+from maze_grid import as_grid, LEFT, RIGHT, UP, DOWN
+
+WALL_RUN = re.compile(rb'\x01+')
+
+
+def _bit_table(side):
+    # bytes.translate table: wall mask -> 1 if that side is closed else 0
+    return bytes(1 if mask & side else 0 for mask in range(256))
+
+
+UP_WALL, DOWN_WALL, LEFT_WALL, RIGHT_WALL = (_bit_table(side) for side in (UP, DOWN, LEFT, RIGHT))
+
+
+def render_svg(maze, original_path, new_path, start, end, rewards, enemies, file_name='maze.svg', cell_size=20):
+    # Drop-in for visualize_maze_svg that writes the file directly instead of
+    # building an svgwrite DOM. Every shared wall is drawn once, collinear
+    # walls are merged into runs, and each layer is a single <path> (walls,
+    # routes) or <use> references to one shape (enemies, rewards).
+    grid = as_grid(maze)
+    padding = 2
+    half = cell_size / 2
+    radius = (cell_size - 2 * padding) / 2
+    ghost_size = cell_size / 1.5
+
+    with open(file_name, 'w', encoding='utf-8') as out:
+        out.write('<?xml version="1.0" encoding="utf-8" ?>\n')
+        out.write('<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+                  'version="1.1" viewBox="0 0 %g %g">' % (cell_size * grid.cols, cell_size * grid.rows))
+        out.write('<defs><circle id="coin" r="%g"/>'
+                  '<text id="bomb" font-size="%g">\U0001F4A3</text></defs>' % (radius, ghost_size))
+
+        out.write('<path stroke="rgb(0%,0%,0%)" fill="none" d="')
+        _write_walls(out, grid, cell_size)
+        out.write('"/>')
+
+        out.write('<g fill="rgb(120%,0%,120%)">')
+        for row, col in grid.enemies():
+            out.write('<use xlink:href="#bomb" x="%g" y="%g"/>'
+                      % (col * cell_size + half - ghost_size / 2, row * cell_size + cell_size - ghost_size / 2))
+        out.write('</g>')
+        _write_coins(out, grid.rewards(), 'rgb(255%,255%,0%)', cell_size)
+
+        for path, colour in ((original_path, 'rgb(0%,0%,255%)'), (new_path, 'rgb(0%,255%,0%)')):
+            if path:
+                out.write('<path stroke="%s" stroke-width="4" fill="none" d="%s"/>'
+                          % (colour, _route(path, cell_size)))
+
+        start_x, start_y = start[1] * cell_size + half, start[0] * cell_size + half
+        end_x, end_y = end[1] * cell_size + half, end[0] * cell_size + half
+        out.write('<text fill="rgb(255%%,0%%,0%%)" font-size="%g" x="%g" y="%g">\U0001F6A9</text>'
+                  % (half, start_x - cell_size / 4, start_y - cell_size / 4))
+        out.write('<text fill="rgb(0%%,255%%,0%%)" font-size="%g" x="%g" y="%g">\U0001F3C1</text>'
+                  % (half, end_x - cell_size / 4, end_y - cell_size / 4))
+
+        _write_coins(out, rewards, 'rgb(128%,0%,128%)', cell_size)
+        out.write('</svg>\n')
+
+
+def _write_walls(out, grid, cell_size):
+    rows, cols, walls = grid.rows, grid.cols, grid.walls
+    # horizontal grid line k separates row k-1 from row k
+    below = bytes(cols)
+    for line in range(rows + 1):
+        above = below
+        if line < rows:
+            below_row = bytes(walls[line * cols:(line + 1) * cols])
+            closed = _either(above, below_row.translate(UP_WALL))
+            below = below_row.translate(DOWN_WALL)
+        else:
+            closed = above
+        y = line * cell_size
+        out.write(''.join('M%d %dH%d' % (run.start() * cell_size, y, run.end() * cell_size)
+                          for run in WALL_RUN.finditer(closed)))
+    # vertical grid line k separates column k-1 from column k
+    right = bytes(rows)
+    for line in range(cols + 1):
+        left = right
+        if line < cols:
+            column = bytes(walls[line::cols])
+            closed = _either(left, column.translate(LEFT_WALL))
+            right = column.translate(RIGHT_WALL)
+        else:
+            closed = left
+        x = line * cell_size
+        out.write(''.join('M%d %dV%d' % (x, run.start() * cell_size, run.end() * cell_size)
+                          for run in WALL_RUN.finditer(closed)))
+
+
+def _either(a, b):
+    # byte-wise OR of two 0/1 byte strings of the same length
+    return (int.from_bytes(a, 'big') | int.from_bytes(b, 'big')).to_bytes(len(a), 'big')
+
+
+def _route(path, cell_size):
+    # only the corners of a route become points, straight stretches are one segment
+    half = cell_size / 2
+    points = [path[0]]
+    for previous, current, following in zip(path, path[1:], path[2:]):
+        if (current[0] - previous[0], current[1] - previous[1]) != (following[0] - current[0], following[1] - current[1]):
+            points.append(current)
+    if len(path) > 1:
+        points.append(path[-1])
+    return 'M' + 'L'.join('%g %g' % (col * cell_size + half, row * cell_size + half) for row, col in points)
+
+
+def _write_coins(out, cells, colour, cell_size):
+    half = cell_size / 2
+    out.write('<g fill="%s">' % colour)
+    for row, col in cells:
+        out.write('<use xlink:href="#coin" x="%g" y="%g"/>' % (col * cell_size + half, row * cell_size + half))
+    out.write('</g>')
+
+
+def compare_renderers(maze, original_path, new_path, start, end, rewards, enemies,
+                      file_name='maze_render_check.svg'):
+    # output size and render time of render_svg against visualize_maze_svg
+    import os
+
+    from maze_with_enemies import MazeNode
+
+    report = {}
+    for name, render in (('visualize_maze_svg', MazeNode.visualize_maze_svg), ('render_svg', render_svg)):
+        started = time.perf_counter()
+        render(maze, original_path, new_path, start, end, rewards, enemies, file_name=file_name)
+        report[name] = {'seconds': time.perf_counter() - started, 'bytes': os.path.getsize(file_name)}
+    os.remove(file_name)
+    return report
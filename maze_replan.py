@@ -0,0 +1,106 @@
+import heapq
+
+from maze_grid import as_grid
+from maze_solvers import NoPathError
+
+INF = float('inf')
+
+
+class IncrementalPlanner:
+    # Lifelong Planning A* (the fixed-start form of D* Lite). g and rhs
+    # survive between calls, so when a cell turns into an enemy only the part
+    # of the shortest path tree that went through it is searched again.
+    def __init__(self, maze, start, end):
+        self.grid = as_grid(maze)
+        cols = self.grid.cols
+        self.start = start[0] * cols + start[1]
+        self.goal = end[0] * cols + end[1]
+        self.g = [INF] * self.grid.size
+        self.rhs = [INF] * self.grid.size
+        self.rhs[self.start] = 0
+        self.open = {}
+        self.heap = []
+        self.expanded = 0
+        self._push(self.start)
+
+    def add_enemy(self, row, col):
+        index = row * self.grid.cols + col
+        if not self.grid.is_enemy(index):
+            self.grid.set_enemy(index)
+            self._update(index)
+
+    def remove_enemy(self, row, col):
+        index = row * self.grid.cols + col
+        if self.grid.is_enemy(index):
+            self.grid.set_enemy(index, False)
+            self._update(index)
+
+    def distance(self):
+        self._compute()
+        return self.g[self.goal]
+
+    def path(self):
+        self._compute()
+        g = self.g
+        if g[self.goal] == INF:
+            raise NoPathError("No path found")
+        cols = self.grid.cols
+        open_neighbors = self.grid.open_neighbors
+        current = self.goal
+        path = [divmod(current, cols)]
+        while current != self.start:
+            current = min(open_neighbors(current), key=g.__getitem__)
+            path.append(divmod(current, cols))
+        path.reverse()
+        return path
+
+    def _heuristic(self, index):
+        cols = self.grid.cols
+        row, col = divmod(index, cols)
+        goal_row, goal_col = divmod(self.goal, cols)
+        return abs(row - goal_row) + abs(col - goal_col)
+
+    def _key(self, index):
+        best = min(self.g[index], self.rhs[index])
+        return (best + self._heuristic(index), best)
+
+    def _push(self, index):
+        key = self._key(index)
+        self.open[index] = key
+        heapq.heappush(self.heap, (key, index))
+
+    def _top_key(self):
+        heap, open_keys = self.heap, self.open
+        # entries are never removed in place, skip the outdated ones
+        while heap and open_keys.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else (INF, INF)
+
+    def _update(self, index):
+        grid = self.grid
+        if index != self.start:
+            if grid.is_enemy(index):
+                self.rhs[index] = INF
+            else:
+                g = self.g
+                self.rhs[index] = min((g[p] for p in grid.open_neighbors(index)), default=INF) + 1
+        self.open.pop(index, None)
+        if self.g[index] != self.rhs[index]:
+            self._push(index)
+
+    def _compute(self):
+        g, rhs, goal = self.g, self.rhs, self.goal
+        open_neighbors = self.grid.open_neighbors
+        while self._top_key() < self._key(goal) or rhs[goal] != g[goal]:
+            _, current = heapq.heappop(self.heap)
+            del self.open[current]
+            self.expanded += 1
+            if g[current] > rhs[current]:
+                g[current] = rhs[current]
+                for neighbor in open_neighbors(current):
+                    self._update(neighbor)
+            else:
+                g[current] = INF
+                self._update(current)
+                for neighbor in open_neighbors(current):
+                    self._update(neighbor)
@@ -0,0 +1,353 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import maze_file
+from distance_field import DistanceField
+from maze_components import pick_end, pick_start
+from maze_generators import generate
+from maze_png import export_png
+from maze_render import render_svg
+from maze_solvers import astar, bfs, dial, NoPathError
+
+DEFAULT_PORT = 8765
+# a line holds a whole path, far past asyncio's 64 KiB default
+LINE_LIMIT = 1 << 24
+GENERATE_OPTIONS = ('num_enemies', 'num_rewards', 'seed', 'open_probability', 'braid')
+SOLVERS = {'bfs': bfs, 'astar': astar, 'dial': dial}
+
+
+# Work done in the pool processes. Mazes travel between processes as
+# maze_file files, which each worker maps (copy on write) once and keeps in a
+# small cache. Served mazes never change, so the distance field of a goal
+# stays valid for as long as the maze does.
+
+_loaded = OrderedDict()
+_fields = OrderedDict()
+
+
+def _cached(cache, key, limit, build):
+    value = cache.get(key)
+    if value is None:
+        value = cache[key] = build()
+        while len(cache) > limit:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(key)
+    return value
+
+
+def _load(file_name):
+    return _cached(_loaded, file_name, 8, lambda: maze_file.load(file_name)[0])
+
+
+def _generate(file_name, generator, rows, cols, options):
+    grid = generate(generator, rows, cols, **options)
+    picker = random.Random(options.get('seed'))
+    component_of = lambda row, col: grid.component(row * cols + col)
+    start = pick_start(component_of, rows, cols, picker)
+    end = pick_end(component_of, rows, cols, start, picker) if start is not None else None
+    maze_file.save(grid, file_name, start, end)
+    return start, end
+
+
+def _solve_batch(file_name, goal, starts):
+    # one reverse search from the goal answers every start; a lone start on
+    # a goal seen for the first time is cheaper as a bfs that stops early.
+    # Every start gets its path, None for no path, or the error it raised,
+    # so one bad start fails only its own request.
+    grid = _load(file_name)
+    if len(starts) == 1 and (file_name, goal) not in _fields:
+        solve_one = lambda start: bfs(grid, start, goal)
+    else:
+        field = _cached(_fields, (file_name, goal), 32, lambda: DistanceField(grid, goal))
+        solve_one = field.path
+    paths = []
+    for start in starts:
+        try:
+            paths.append(solve_one(start))
+        except NoPathError:
+            paths.append(None)
+        except Exception as error:
+            paths.append(error)
+    return paths
+
+
+def _solve_one(file_name, algorithm, start, end):
+    return SOLVERS[algorithm](_load(file_name), start, end)
+
+
+def _render(file_name, output, path, start, end):
+    grid = _load(file_name)
+    render = render_svg if output.endswith('.svg') else export_png
+    render(grid, path, [], start, end, [], [], file_name=output)
+    return os.path.getsize(output)
+
+
+class MazeService:
+    # JSON lines server. Each request is one object with a "cmd" (generate,
+    # solve, render, drop) and an optional "tag" echoed in the reply, so a
+    # client may pipeline requests on one connection. Mazes stay loaded by id;
+    # everything CPU bound runs in the process pool. bfs solves for the same
+    # maze and goal share a single DistanceField search: a batch stays open
+    # for at least batch_window seconds and for as long as every worker is
+    # busy, so the more loaded the server, the larger the batches.
+    def __init__(self, workers=None, batch_window=0.002, directory=None):
+        workers = workers or os.cpu_count()
+        self.pool = ProcessPoolExecutor(workers)
+        self.slots = asyncio.Semaphore(workers)
+        self.batch_window = batch_window
+        self.owns_directory = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix='maze_service_')
+        self.mazes = {}
+        self.pending = {}
+        self.next_id = 1
+        self.solves = 0
+        self.batches = 0
+
+    async def handle(self, reader, writer):
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._answer(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def _answer(self, line, writer):
+        # every line gets a reply, whatever goes wrong answering it
+        request = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object")
+            handler = getattr(self, 'do_' + str(request.get('cmd')), None)
+            if handler is None:
+                raise ValueError("Unknown command %r" % request.get('cmd'))
+            response = dict(await handler(request), ok=True)
+        except Exception as error:
+            response = {'ok': False, 'error': str(error) or type(error).__name__}
+        if isinstance(request, dict) and 'tag' in request:
+            response['tag'] = request['tag']
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
+
+    async def _offload(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, function, *args)
+
+    def _maze(self, request):
+        maze_id = request.get('maze')
+        if maze_id not in self.mazes:
+            raise ValueError("Unknown maze %r" % maze_id)
+        return maze_id, self.mazes[maze_id]
+
+    async def do_generate(self, request):
+        maze_id = 'm%d' % self.next_id
+        self.next_id += 1
+        rows, cols = int(request.get('rows', 40)), int(request.get('cols', 40))
+        file_name = os.path.join(self.directory, maze_id + '.maze')
+        options = {key: request[key] for key in GENERATE_OPTIONS if key in request}
+        start, end = await self._offload(_generate, file_name, request.get('generator', 'random'), rows, cols,
+                                         options)
+        self.mazes[maze_id] = {'file': file_name, 'rows': rows, 'cols': cols, 'start': start, 'end': end}
+        return {'maze': maze_id, 'rows': rows, 'cols': cols, 'start': start, 'end': end}
+
+    async def do_solve(self, request):
+        maze_id, maze = self._maze(request)
+        start = tuple(request.get('start') or maze['start'] or ())
+        end = tuple(request.get('end') or maze['end'] or ())
+        if len(start) != 2 or len(end) != 2:
+            raise ValueError("solve needs a start and an end")
+        for row, col in (start, end):
+            # checked before queueing: a bad cell must not fail the batch it would join
+            if not all(isinstance(value, int) and not isinstance(value, bool) for value in (row, col)):
+                raise ValueError("Cell coordinates must be integers, got %r" % ([row, col],))
+            if not (0 <= row < maze['rows'] and 0 <= col < maze['cols']):
+                raise ValueError("Cell (%d, %d) is outside the maze" % (row, col))
+        algorithm = request.get('algorithm', 'bfs')
+        if algorithm not in SOLVERS:
+            raise ValueError("Unknown algorithm %r" % algorithm)
+        self.solves += 1
+        if algorithm == 'bfs':
+            path = await self._batched(maze_id, start, end)
+        else:
+            path = await self._offload(_solve_one, maze['file'], algorithm, start, end)
+        return {'path': path, 'length': len(path)}
+
+    def _batched(self, maze_id, start, end):
+        key = (maze_id, end)
+        future = asyncio.get_running_loop().create_future()
+        batch = self.pending.get(key)
+        if batch is None:
+            batch = self.pending[key] = []
+            asyncio.ensure_future(self._run_batch(key))
+        batch.append((start, future))
+        return future
+
+    async def _run_batch(self, key):
+        maze_id, end = key
+        await asyncio.sleep(self.batch_window)
+        async with self.slots:
+            # requests that came in while waiting for a worker join this batch
+            batch = self.pending.pop(key)
+            self.batches += 1
+            try:
+                if maze_id not in self.mazes:
+                    raise ValueError("Unknown maze %r" % maze_id)
+                paths = await self._offload(_solve_batch, self.mazes[maze_id]['file'], end,
+                                            [start for start, _ in batch])
+            except Exception as error:
+                for _, future in batch:
+                    future.set_exception(error)
+                return
+        for (_, future), path in zip(batch, paths):
+            if path is None:
+                future.set_exception(NoPathError("No path found"))
+            elif isinstance(path, Exception):
+                future.set_exception(path)
+            else:
+                future.set_result(path)
+
+    async def do_render(self, request):
+        _, maze = self._maze(request)
+        output = request.get('file') or os.path.join(self.directory, request['maze'] + '.png')
+        start = tuple(request.get('start') or maze['start'] or (0, 0))
+        end = tuple(request.get('end') or maze['end'] or (maze['rows'] - 1, maze['cols'] - 1))
+        size = await self._offload(_render, maze['file'], output, request.get('path') or [], start, end)
+        return {'file': output, 'bytes': size}
+
+    async def do_drop(self, request):
+        maze_id, maze = self._maze(request)
+        del self.mazes[maze_id]
+        os.remove(maze['file'])
+        return {'maze': maze_id}
+
+    async def do_stats(self, request):
+        return {'mazes': len(self.mazes), 'solves': self.solves, 'batches': self.batches}
+
+    def close(self):
+        self.pool.shutdown()
+        if self.owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+async def serve(host='127.0.0.1', port=DEFAULT_PORT, unix=None, workers=None, batch_window=0.002):
+    service = MazeService(workers, batch_window)
+    if unix:
+        server = await asyncio.start_unix_server(service.handle, path=unix, limit=LINE_LIMIT)
+    else:
+        server = await asyncio.start_server(service.handle, host, port, limit=LINE_LIMIT)
+    print("serving on", unix or "%s:%d" % (host, port))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+async def _connect(host, port, unix):
+    if unix:
+        return await asyncio.open_unix_connection(unix, limit=LINE_LIMIT)
+    return await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+
+
+async def _call(reader, writer, request):
+    writer.write(json.dumps(request).encode() + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+async def load_test(host='127.0.0.1', port=DEFAULT_PORT, unix=None, requests=1000, concurrency=32, rows=200,
+                    cols=200, goals=4, generator='kruskal', algorithm='bfs', seed=0):
+    # Generates one maze, then fires solves from concurrency connections at
+    # a handful of goals (so batching has something to merge) and reports
+    # latency percentiles.
+    reader, writer = await _connect(host, port, unix)
+    maze = await _call(reader, writer, {'cmd': 'generate', 'generator': generator, 'rows': rows, 'cols': cols,
+                                        'num_enemies': rows * cols // 400, 'num_rewards': 0, 'braid': 0.5,
+                                        'seed': seed})
+    if not maze['ok']:
+        raise ValueError(maze['error'])
+    picker = random.Random(seed)
+    targets = [(picker.randrange(rows), picker.randrange(cols)) for _ in range(goals)]
+    latencies = []
+    failed = 0
+
+    async def client(count):
+        nonlocal failed
+        client_reader, client_writer = await _connect(host, port, unix)
+        for _ in range(count):
+            request = {'cmd': 'solve', 'maze': maze['maze'], 'algorithm': algorithm,
+                       'start': (picker.randrange(rows), picker.randrange(cols)), 'end': picker.choice(targets)}
+            started = time.perf_counter()
+            response = await _call(client_reader, client_writer, request)
+            latencies.append(time.perf_counter() - started)
+            failed += not response['ok']
+        client_writer.close()
+
+    started = time.perf_counter()
+    shares = [requests // concurrency + (n < requests % concurrency) for n in range(concurrency)]
+    await asyncio.gather(*(client(count) for count in shares if count))
+    elapsed = time.perf_counter() - started
+    stats = await _call(reader, writer, {'cmd': 'stats'})
+    await _call(reader, writer, {'cmd': 'drop', 'maze': maze['maze']})
+    writer.close()
+
+    latencies.sort()
+    return {'requests': len(latencies), 'failed': failed, 'seconds': elapsed,
+            'per_second': len(latencies) / elapsed, 'p50_ms': 1000 * _percentile(latencies, 0.50),
+            'p99_ms': 1000 * _percentile(latencies, 0.99), 'server': stats}
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long lived maze generate/solve/render service.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name in ('serve', 'load'):
+        command = commands.add_parser(name)
+        command.add_argument('--host', default='127.0.0.1')
+        command.add_argument('--port', type=int, default=DEFAULT_PORT)
+        command.add_argument('--unix', help="unix socket path instead of TCP")
+        if name == 'serve':
+            command.add_argument('--workers', type=int)
+            command.add_argument('--batch-window', type=float, default=0.002, help="seconds")
+        else:
+            command.add_argument('--requests', type=int, default=1000)
+            command.add_argument('--concurrency', type=int, default=32)
+            command.add_argument('--size', type=int, default=200)
+            command.add_argument('--goals', type=int, default=4)
+            command.add_argument('--generator', default='kruskal')
+            command.add_argument('--algorithm', choices=sorted(SOLVERS), default='bfs')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        try:
+            asyncio.run(serve(args.host, args.port, args.unix, args.workers, args.batch_window))
+        except KeyboardInterrupt:
+            pass
+        return
+    report = asyncio.run(load_test(args.host, args.port, args.unix, args.requests, args.concurrency, args.size,
+                                   args.size, args.goals, args.generator, args.algorithm))
+    print("%d solves (%d failed) in %.2f s, %.0f/s, p50 %.1f ms, p99 %.1f ms, %d batches"
+          % (report['requests'], report['failed'], report['seconds'], report['per_second'], report['p50_ms'],
+             report['p99_ms'], report['server']['batches']))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+import heapq
+import math
+import threading
+import weakref
+from array import array
+from collections import deque
+
+from maze_grid import as_grid
+from search_stats import phase
+
+
+class NoPathError(ValueError):
+    # end cannot be reached from start. A ValueError, so callers that catch
+    # that keep working, but distinct from a bad argument.
+    pass
+
+
+class SolverWorkspace:
+    # Search arrays preallocated once per maze and reused by every query.
+    # dist/parent only count for cells whose stamp equals the current epoch,
+    # so a new query bumps the epoch instead of clearing N entries and costs
+    # only what it explores. Not thread safe: keep one per thread, which is
+    # what workspace_for does.
+    def __init__(self, size):
+        self.size = size
+        # 64 bit: dial's totals reach path length * MAX_STEP_COST
+        self.dist = array('q', [0]) * size
+        self.parent = array('i', [0]) * size
+        self.stamp = array('I', [0]) * size
+        self.closed = array('I', [0]) * size
+        self.epoch = 0
+
+    def begin(self):
+        self.epoch += 1
+        if self.epoch > 0xFFFFFFFF:
+            # once every 4 billion queries the stamps really are cleared
+            self.stamp = array('I', [0]) * self.size
+            self.closed = array('I', [0]) * self.size
+            self.epoch = 1
+        return self.epoch
+
+    def reached(self, index):
+        return self.stamp[index] == self.epoch
+
+    def path(self, source, target, cols):
+        parent = self.parent
+        path = []
+        current = target
+        while current != source:
+            path.append(divmod(current, cols))
+            current = parent[current]
+        path.append(divmod(source, cols))
+        path.reverse()
+        return path
+
+
+class _Sparse(dict):
+    # a cell never written reads as 0, like a fresh array slot
+    def __missing__(self, key):
+        return 0
+
+
+class SparseWorkspace(SolverWorkspace):
+    # The same workspace with dicts in place of the four arrays, for grids
+    # too big to give every cell a slot (tiled_maze.TiledMaze). Memory grows
+    # with the cells a query touches and begin() clears only those.
+    def __init__(self, size):
+        self.size = size
+        self.dist = _Sparse()
+        self.parent = _Sparse()
+        self.stamp = _Sparse()
+        self.closed = _Sparse()
+        self.epoch = 1
+
+    def begin(self):
+        for table in (self.dist, self.parent, self.stamp, self.closed):
+            table.clear()
+        return self.epoch
+
+
+_local = threading.local()
+
+
+def workspace_for(grid):
+    # one workspace per maze and per thread, dropped with the maze; grids
+    # that set sparse = True get a SparseWorkspace
+    workspaces = getattr(_local, 'workspaces', None)
+    if workspaces is None:
+        workspaces = _local.workspaces = weakref.WeakKeyDictionary()
+    workspace = workspaces.get(grid)
+    if workspace is None or workspace.size != grid.size:
+        factory = SparseWorkspace if getattr(grid, 'sparse', False) else SolverWorkspace
+        workspace = workspaces[grid] = factory(grid.size)
+    return workspace
+
+
+def search(maze, start, end, method='bfs', heuristic='manhattan', costs=None, workspace=None, stats=None):
+    # Runs one search and leaves its result in the workspace instead of
+    # building the path: returns (expanded, workspace), where
+    # workspace.reached(target) tells whether end was found and
+    # workspace.path(source, target, cols) walks it. method is 'bfs',
+    # 'astar' (with heuristic, a function or a HEURISTICS name) or 'dial'
+    # (with costs from step_costs, the defaults when None).
+    grid = as_grid(maze)
+    if workspace is None:
+        workspace = workspace_for(grid)
+    if method == 'bfs':
+        engine, options = _bfs_search, ()
+    elif method == 'astar':
+        engine, options = _astar_search, (HEURISTICS[heuristic] if isinstance(heuristic, str) else heuristic,)
+    elif method == 'dial':
+        if costs is None:
+            with phase(stats, 'costs'):
+                costs = step_costs(grid)
+        engine, options = _dial_search, (costs,)
+    else:
+        raise ValueError("Unknown search method: %s" % method)
+    cols = grid.cols
+    source = start[0] * cols + start[1]
+    target = end[0] * cols + end[1]
+    if stats is None:
+        return engine(grid, source, target, workspace, *options), workspace
+    with stats.phase('search'):
+        expanded = INSTRUMENTED[engine](grid, source, target, workspace, *options, stats)
+    stats.expanded += expanded
+    return expanded, workspace
+
+
+def _run(maze, start, end, method, workspace, stats=None, **options):
+    grid = as_grid(maze)
+    _, workspace = search(grid, start, end, method, workspace=workspace, stats=stats, **options)
+    cols = grid.cols
+    source = start[0] * cols + start[1]
+    target = end[0] * cols + end[1]
+    if not workspace.reached(target):
+        raise NoPathError("No path found")
+    with phase(stats, 'path'):
+        return workspace.path(source, target, cols)
+
+
+def bfs(maze, start, end, workspace=None, stats=None):
+    # Every step costs 1, so a plain breadth first search finds the same
+    # shortest paths as dijkstra without a heap.
+    return _run(maze, start, end, 'bfs', workspace, stats=stats)
+
+
+def _bfs_search(grid, source, target, workspace):
+    neighbors = grid.neighbors
+    epoch = workspace.begin()
+    stamp, parent = workspace.stamp, workspace.parent
+    stamp[source] = epoch
+    parent[source] = source
+    queue = deque([source])
+    expanded = 0
+
+    while queue:
+        current = queue.popleft()
+        expanded += 1
+        if current == target:
+            break
+        for neighbor in neighbors(current):
+            if stamp[neighbor] != epoch:
+                stamp[neighbor] = epoch
+                parent[neighbor] = current
+                queue.append(neighbor)
+
+    return expanded
+
+
+def _bfs_search_stats(grid, source, target, workspace, stats):
+    # _bfs_search with counters and the sampled trace; dist is only kept for the trace
+    neighbors = grid.neighbors
+    cols = grid.cols
+    trace, sample = stats.trace, stats.sample
+    epoch = workspace.begin()
+    stamp, parent, dist = workspace.stamp, workspace.parent, workspace.dist
+    stamp[source] = epoch
+    parent[source] = source
+    dist[source] = 0
+    queue = deque([source])
+    stats.pushes += 1
+    peak = 1
+    expanded = 0
+
+    while queue:
+        current = queue.popleft()
+        stats.pops += 1
+        expanded += 1
+        if trace is not None and expanded % sample == 0:
+            stats.record(expanded, current, cols, dist[current], len(queue))
+        if current == target:
+            break
+        for neighbor in neighbors(current):
+            stats.relaxations += 1
+            if stamp[neighbor] != epoch:
+                stamp[neighbor] = epoch
+                parent[neighbor] = current
+                dist[neighbor] = dist[current] + 1
+                queue.append(neighbor)
+                stats.pushes += 1
+        if len(queue) > peak:
+            peak = len(queue)
+
+    stats.frontier_peak = max(stats.frontier_peak, peak)
+    return expanded
+
+
+def manhattan(row_delta, col_delta):
+    return row_delta + col_delta
+
+
+def octile(row_delta, col_delta):
+    # admissible here too, just weaker than manhattan on a 4-connected grid
+    return max(row_delta, col_delta) + (math.sqrt(2) - 1) * min(row_delta, col_delta)
+
+
+def zero(row_delta, col_delta):
+    return 0
+
+
+HEURISTICS = {'manhattan': manhattan, 'octile': octile, 'zero': zero}
+
+
+def astar(maze, start, end, heuristic=manhattan, workspace=None, stats=None):
+    return _run(maze, start, end, 'astar', workspace, stats=stats, heuristic=heuristic)
+
+
+def _astar_search(grid, source, target, workspace, heuristic):
+    neighbors = grid.neighbors
+    cols = grid.cols
+    end_row, end_col = divmod(target, cols)
+    epoch = workspace.begin()
+    stamp, closed, best, parent = workspace.stamp, workspace.closed, workspace.dist, workspace.parent
+    stamp[source] = epoch
+    best[source] = 0
+    parent[source] = source
+    # ties on f go to the larger g (deeper node), which is usually closer to the goal
+    start_row, start_col = divmod(source, cols)
+    frontier = [(heuristic(abs(start_row - end_row), abs(start_col - end_col)), 0, source)]
+    expanded = 0
+
+    while frontier:
+        _, negative_g, current = heapq.heappop(frontier)
+        if closed[current] == epoch:
+            continue
+        closed[current] = epoch
+        expanded += 1
+        if current == target:
+            break
+        g = 1 - negative_g
+        for neighbor in neighbors(current):
+            if closed[neighbor] == epoch:
+                continue
+            if stamp[neighbor] != epoch or g < best[neighbor]:
+                stamp[neighbor] = epoch
+                best[neighbor] = g
+                parent[neighbor] = current
+                row, col = divmod(neighbor, cols)
+                heapq.heappush(frontier, (g + heuristic(abs(row - end_row), abs(col - end_col)), -g, neighbor))
+
+    return expanded
+
+
+def _astar_search_stats(grid, source, target, workspace, heuristic, stats):
+    # _astar_search with counters and the sampled trace
+    neighbors = grid.neighbors
+    cols = grid.cols
+    trace, sample = stats.trace, stats.sample
+    end_row, end_col = divmod(target, cols)
+    epoch = workspace.begin()
+    stamp, closed, best, parent = workspace.stamp, workspace.closed, workspace.dist, workspace.parent
+    stamp[source] = epoch
+    best[source] = 0
+    parent[source] = source
+    start_row, start_col = divmod(source, cols)
+    frontier = [(heuristic(abs(start_row - end_row), abs(start_col - end_col)), 0, source)]
+    stats.pushes += 1
+    peak = 1
+    expanded = 0
+
+    while frontier:
+        _, negative_g, current = heapq.heappop(frontier)
+        stats.pops += 1
+        if closed[current] == epoch:
+            stats.stale_pops += 1
+            continue
+        closed[current] = epoch
+        expanded += 1
+        if trace is not None and expanded % sample == 0:
+            stats.record(expanded, current, cols, -negative_g, len(frontier))
+        if current == target:
+            break
+        g = 1 - negative_g
+        for neighbor in neighbors(current):
+            if closed[neighbor] == epoch:
+                continue
+            stats.relaxations += 1
+            if stamp[neighbor] != epoch or g < best[neighbor]:
+                stamp[neighbor] = epoch
+                best[neighbor] = g
+                parent[neighbor] = current
+                row, col = divmod(neighbor, cols)
+                heapq.heappush(frontier, (g + heuristic(abs(row - end_row), abs(col - end_col)), -g, neighbor))
+                stats.pushes += 1
+        if len(frontier) > peak:
+            peak = len(frontier)
+
+    stats.frontier_peak = max(stats.frontier_peak, peak)
+    return expanded
+
+
+# step costs are stored as unsigned 16 bit values, and dial keeps one bucket
+# per possible cost
+MAX_STEP_COST = 0xFFFF
+
+
+def danger_field(grid):
+    # multi-source BFS from every enemy: steps (through open passages) from
+    # each cell to the nearest enemy, -1 where no enemy can be reached
+    open_neighbors = grid.open_neighbors
+    danger = array('i', [-1]) * grid.size
+    queue = deque()
+    for row, col in grid.enemies():
+        index = row * grid.cols + col
+        danger[index] = 0
+        queue.append(index)
+    while queue:
+        current = queue.popleft()
+        for neighbor in open_neighbors(current):
+            if danger[neighbor] == -1:
+                danger[neighbor] = danger[current] + 1
+                queue.append(neighbor)
+    return danger
+
+
+def step_costs(grid, radius=3, weight=4, enemy_cost=None, danger=None):
+    # cost of stepping into each cell: 1 plus weight for every step closer
+    # than radius to an enemy. Enemy cells get enemy_cost, or 0 meaning
+    # "never" when enemy_cost is None. Costs are 16 bit, anything that would
+    # not fit is refused here rather than halfway through the grid.
+    if radius < 0 or weight < 0 or (enemy_cost is not None and enemy_cost < 0):
+        raise ValueError("radius, weight and enemy_cost must not be negative")
+    highest = max(1 + max(radius - 1, 0) * weight, enemy_cost or 0)
+    if highest > MAX_STEP_COST:
+        raise ValueError("Step costs go up to %d, at most %d is supported (radius=%d, weight=%d, enemy_cost=%s)"
+                         % (highest, MAX_STEP_COST, radius, weight, enemy_cost))
+    if danger is None:
+        danger = danger_field(grid)
+    costs = array('H', [0]) * grid.size
+    for index in range(grid.size):
+        near = danger[index]
+        if near == 0:
+            costs[index] = enemy_cost or 0
+        elif near == -1 or near >= radius:
+            costs[index] = 1
+        else:
+            costs[index] = 1 + (radius - near) * weight
+    return costs
+
+
+def dial(maze, start, end, radius=3, weight=4, enemy_cost=None, costs=None, workspace=None, stats=None):
+    # Shortest path under small integer step costs with Dial's bucket queue:
+    # one bucket per distance modulo the largest step cost, no heap.
+    grid = as_grid(maze)
+    if costs is None:
+        with phase(stats, 'costs'):
+            costs = step_costs(grid, radius, weight, enemy_cost)
+    return _run(grid, start, end, 'dial', workspace, stats=stats, costs=costs)
+
+
+def _dial_search(grid, source, target, workspace, costs):
+    open_neighbors = grid.open_neighbors
+    span = max(costs) + 1
+    buckets = [[] for _ in range(span)]
+    epoch = workspace.begin()
+    stamp, dist, parent = workspace.stamp, workspace.dist, workspace.parent
+    stamp[source] = epoch
+    dist[source] = 0
+    parent[source] = source
+    buckets[0].append(source)
+    pending = 1
+    current = 0
+    expanded = 0
+
+    while pending:
+        bucket = buckets[current % span]
+        while not bucket:
+            current += 1
+            bucket = buckets[current % span]
+        node = bucket.pop()
+        pending -= 1
+        if dist[node] != current:
+            continue
+        expanded += 1
+        if node == target:
+            break
+        for neighbor in open_neighbors(node):
+            cost = costs[neighbor]
+            if not cost:
+                continue
+            distance = current + cost
+            if stamp[neighbor] != epoch or distance < dist[neighbor]:
+                stamp[neighbor] = epoch
+                dist[neighbor] = distance
+                parent[neighbor] = node
+                buckets[distance % span].append(neighbor)
+                pending += 1
+
+    return expanded
+
+
+def _dial_search_stats(grid, source, target, workspace, costs, stats):
+    # _dial_search with counters and the sampled trace
+    open_neighbors = grid.open_neighbors
+    cols = grid.cols
+    trace, sample = stats.trace, stats.sample
+    span = max(costs) + 1
+    buckets = [[] for _ in range(span)]
+    epoch = workspace.begin()
+    stamp, dist, parent = workspace.stamp, workspace.dist, workspace.parent
+    stamp[source] = epoch
+    dist[source] = 0
+    parent[source] = source
+    buckets[0].append(source)
+    stats.pushes += 1
+    pending = peak = 1
+    current = 0
+    expanded = 0
+
+    while pending:
+        bucket = buckets[current % span]
+        while not bucket:
+            current += 1
+            bucket = buckets[current % span]
+        node = bucket.pop()
+        pending -= 1
+        stats.pops += 1
+        if dist[node] != current:
+            stats.stale_pops += 1
+            continue
+        expanded += 1
+        if trace is not None and expanded % sample == 0:
+            stats.record(expanded, node, cols, current, pending)
+        if node == target:
+            break
+        for neighbor in open_neighbors(node):
+            cost = costs[neighbor]
+            if not cost:
+                continue
+            stats.relaxations += 1
+            distance = current + cost
+            if stamp[neighbor] != epoch or distance < dist[neighbor]:
+                stamp[neighbor] = epoch
+                dist[neighbor] = distance
+                parent[neighbor] = node
+                buckets[distance % span].append(neighbor)
+                pending += 1
+                stats.pushes += 1
+        if pending > peak:
+            peak = pending
+
+    stats.frontier_peak = max(stats.frontier_peak, peak)
+    return expanded
+
+
+INSTRUMENTED = {
+    _bfs_search: _bfs_search_stats,
+    _astar_search: _astar_search_stats,
+    _dial_search: _dial_search_stats,
+}
+
+
+def solve(maze, start, end, avoid_radius=0, avoid_weight=4, enemy_cost=None, stats=None):
+    # entry point for callers that do not care which engine runs: uniform
+    # costs go to bfs, enemy proximity penalties to the bucket queue solver
+    if avoid_radius or enemy_cost:
+        return dial(maze, start, end, avoid_radius, avoid_weight, enemy_cost, stats=stats)
+    return bfs(maze, start, end, stats=stats)
@@ -0,0 +1,113 @@
+import random
+
+import numpy as np
+
+from maze_grid import LEFT, RIGHT, UP, DOWN, ALL_WALLS
+from search_stats import phase
+
+
+def eller_rows(rows, cols, num_enemies=0, num_rewards=0, seed=None, stats=None):
+    # Eller's algorithm. Only the current row's set ids are kept, so memory is
+    # O(cols) however many rows are generated. Yields (walls, enemy, reward)
+    # per row: a bytearray of wall masks and two bit planes for that row.
+    # stats gets the 'carve' and 'items' phases and the rows produced; time
+    # the consumer spends between rows is not counted.
+    carver = random.Random(seed)
+    placer = _ItemPlacer(rows * cols, num_enemies, num_rewards, seed)
+    sets = [0] * cols
+    next_set = 1
+    open_up = bytearray(cols)
+
+    for row in range(rows):
+        with phase(stats, 'carve'):
+            last_row = row == rows - 1
+            walls = bytearray([ALL_WALLS]) * cols
+            for col in range(cols):
+                if open_up[col]:
+                    walls[col] &= ~UP & ALL_WALLS
+                if not sets[col]:
+                    sets[col] = next_set
+                    next_set += 1
+
+            members = {}
+            for col, label in enumerate(sets):
+                members.setdefault(label, []).append(col)
+
+            # join neighbours in different sets, always on the last row
+            for col in range(cols - 1):
+                keep, drop = sets[col], sets[col + 1]
+                if keep != drop and (last_row or carver.random() < 0.5):
+                    walls[col] &= ~RIGHT & ALL_WALLS
+                    walls[col + 1] &= ~LEFT & ALL_WALLS
+                    if len(members[keep]) < len(members[drop]):
+                        keep, drop = drop, keep
+                    for member in members[drop]:
+                        sets[member] = keep
+                    members[keep].extend(members.pop(drop))
+
+            open_up = bytearray(cols)
+            if not last_row:
+                # every set carries on downwards through at least one cell
+                for label, cells in members.items():
+                    down = [col for col in cells if carver.random() < 0.5]
+                    if not down:
+                        down = [carver.choice(cells)]
+                    for col in down:
+                        walls[col] &= ~DOWN & ALL_WALLS
+                        open_up[col] = 1
+                sets = [label if open_up[col] else 0 for col, label in enumerate(sets)]
+
+        with phase(stats, 'items'):
+            enemy, reward = placer.row(cols)
+        if stats is not None:
+            stats.rows += 1
+        yield walls, enemy, reward
+
+
+class _ItemPlacer:
+    # Spreads exactly num_enemies and num_rewards distinct cells over the
+    # stream without knowing the rows in advance: each row takes a
+    # hypergeometric share of what is left.
+    def __init__(self, size, num_enemies, num_rewards, seed):
+        if num_enemies + num_rewards > size:
+            raise ValueError("Not enough cells for %d enemies and %d rewards" % (num_enemies, num_rewards))
+        self.rng = np.random.default_rng(seed)
+        self.remaining = size
+        self.enemies = num_enemies
+        self.rewards = num_rewards
+
+    def row(self, cols):
+        rng = self.rng
+        wanted = self.enemies + self.rewards
+        enemy = np.zeros(cols, dtype=bool)
+        reward = np.zeros(cols, dtype=bool)
+        if wanted:
+            taken = rng.hypergeometric(wanted, self.remaining - wanted, cols) if self.remaining > cols else wanted
+            cells = rng.choice(cols, taken, replace=False)
+            enemies = rng.hypergeometric(self.enemies, self.rewards, taken) if taken else 0
+            enemy[cells[:enemies]] = True
+            reward[cells[enemies:]] = True
+            self.enemies -= enemies
+            self.rewards -= taken - enemies
+        self.remaining -= cols
+        return (np.packbits(enemy, bitorder='little').tobytes(),
+                np.packbits(reward, bitorder='little').tobytes())
+
+
+def write_ascii(row_iter, cols, out):
+    # streaming text renderer, one row in, two lines out
+    out.write("+" + "--+" * cols + "\n")
+    for walls, enemy, reward in row_iter:
+        cells = ["|"]
+        floor = ["+"]
+        for col in range(cols):
+            if enemy[col >> 3] >> (col & 7) & 1:
+                cells.append("**")
+            elif reward[col >> 3] >> (col & 7) & 1:
+                cells.append("()")
+            else:
+                cells.append("  ")
+            cells.append("|" if walls[col] & RIGHT else " ")
+            floor.append("--+" if walls[col] & DOWN else "  +")
+        out.write("".join(cells) + "\n")
+        out.write("".join(floor) + "\n")
@@ -1,6 +1,9 @@
 import random
 import svgwrite
-import heapq
+
+from maze_components import DisjointSet, pick_end, pick_start
+from maze_replan import IncrementalPlanner
+from maze_solvers import solve
 
 class MazeNode:
     def __init__(self, row, col):
@@ -14,21 +17,31 @@ class MazeNode:
         self.visited = False
         self.is_enemy = False
         self.is_reward = False
+        self.component = None
 
     def __lt__(self, other):
         return self.distance < other.distance
 
     def generate_random_maze(rows, cols, num_enemies=10, num_rewards=5):
         maze = [[MazeNode(row, col) for col in range(cols)] for row in range(rows)]
+        components = DisjointSet(rows * cols)
 
         for row in range(rows):
             for col in range(cols):
                 if col < cols - 1 and random.choice([True, False]):
                     maze[row][col].right = maze[row][col + 1]
                     maze[row][col + 1].left = maze[row][col]
+                    components.union(row * cols + col, row * cols + col + 1)
                 if row < rows - 1 and random.choice([True, False]):
                     maze[row][col].down = maze[row + 1][col]
                     maze[row + 1][col].up = maze[row][col]
+                    components.union(row * cols + col, (row + 1) * cols + col)
+
+        # connectivity is known up front, no need to search to find out there is no path
+        components.compress()
+        for row in maze:
+            for node in row:
+                node.component = components.parent[node.row * cols + node.col]
 
         for _ in range(num_enemies):
             enemy_row = random.randint(0, rows - 1)
@@ -43,13 +56,18 @@ class MazeNode:
 
         return maze
 
-    def generate_start_on_border(rows, cols):
+    def generate_start_on_border(rows, cols, maze=None):
         print("maze border start")
+        if maze is not None:
+            # only starts whose component reaches an end cell, None if there is none
+            return pick_start(lambda row, col: maze[row][col].component, rows, cols)
         return (random.randint(1, rows - 2), 0)
 
 
-    def generate_end_on_border(rows, cols, start):
+    def generate_end_on_border(rows, cols, start, maze=None):
         print("maze end border")
+        if maze is not None:
+            return pick_end(lambda row, col: maze[row][col].component, rows, cols, start)
         side = random.choice(["top", "bottom", "left", "right"])
         if side == "top" and start[0] != 0:
             return (0, random.randint(1, cols - 2))
@@ -63,58 +81,10 @@ class MazeNode:
             return MazeNode.generate_end_on_border(rows, cols, start)
 
     def dijkstra(maze, start, end):
-        print("dijkstra alg")
-        for row in maze:
-            for node in row:
-                node.visited = False
-                node.distance = float('inf')
-
-        start_node = maze[start[0]][start[1]]
-        end_node = maze[end[0]][end[1]]
-
-        priority_queue = [(0, start_node)]
-
-        while priority_queue:
-            print("dij while")
-            current_distance, current_node = heapq.heappop(priority_queue)
-
-            if current_node.visited:
-                # print("dij while if")
-                continue
-
-            current_node.visited = True
-            current_node.distance = current_distance
-            # print("whi af if")
-
-            neighbors = [current_node.left, current_node.right, current_node.up, current_node.down]
-            # no  path found thus the above elements are none
-            print(neighbors)
-            # after filtering none have to do some changes in "if" loop.
-            for neighbor in filter(None, neighbors):
-                print("nei = ",neighbor)
-                if not neighbor.visited and not neighbor.is_enemy:
-                    new_distance = current_distance + 1
-                    if new_distance < neighbor.distance:
-                        neighbor.distance = new_distance
-                        heapq.heappush(priority_queue, (new_distance, neighbor))
-        # print(end_node.distance)
-        if end_node.distance == float('inf'):
-            raise ValueError("No path found")
-
-        path = []
-        current_node = end_node
-
-
-
-        
-        while current_node != start_node:
-            path.append((current_node.row, current_node.col))
-            neighbors = [current_node.left, current_node.right, current_node.up, current_node.down]
-            valid_neighbors = [n for n in neighbors if n and not n.is_enemy]
-            current_node = min(valid_neighbors, key=lambda x: x.distance)
-
-        path.append((start_node.row, start_node.col))
-        return list(reversed(path))
+        # every edge costs 1, so this is routed to the breadth first solver. A
+        # list of nodes is converted to a MazeGrid on every call; callers that
+        # solve the same maze repeatedly pass MazeGrid.from_nodes(maze) instead
+        return solve(maze, start, end)
 
     def visualize_maze_svg(maze, original_path, new_path, start, end, rewards, enemies, file_name='maze.svg'):
         cell_size = 20
@@ -179,41 +149,49 @@ class MazeNode:
         dwg.save()
 
 # Example usage
-rows, cols = 40, 40
-
-random_num_enemies = random.randint(1, 10) + 30
-random_num_rewards = random.randint(1, 10) + 40
-
-random_maze = MazeNode.generate_random_maze(rows, cols, num_enemies=random_num_enemies, num_rewards=random_num_rewards)
-start_point = MazeNode.generate_start_on_border(rows, cols)
-end_point = MazeNode.generate_end_on_border(rows, cols, start_point)
-
-try:
-    shortest_path = MazeNode.dijkstra(random_maze, start_point, end_point)
-    num_enemies_along_path = 2
-    enemy_positions = random.sample(shortest_path, num_enemies_along_path)
-
-    for row, col in enemy_positions:
-        random_maze[row][col].is_enemy = True
-
-    new_shortest_path = MazeNode.dijkstra(random_maze, start_point, end_point)
-
-    path_stack = new_shortest_path.copy()
-    path_stack.append(start_point)
-    path_stack.append(end_point)
-    path_stack.extend(enemy_positions)
-    reward_locations = [(node.row, node.col) for row in random_maze for node in row if node.is_reward]
-    path_stack.extend(reward_locations)
-
-    print("Start Point:", start_point)
-    print("End Point:", end_point)
-    print("Number of Enemies:", random_num_enemies)
-    print("Number of Rewards:", random_num_rewards)
-    print("Shortest Path (Original):", shortest_path)
-    print("Shortest Path (Avoiding Enemies):", new_shortest_path)
-
-    MazeNode.visualize_maze_svg(random_maze, shortest_path, new_shortest_path, start_point, end_point, reward_locations, enemy_positions, file_name='maze_with_both_paths.svg')
-
-except ValueError as e:
-    print(e)
-    MazeNode.visualize_maze_svg(random_maze, [], [], start_point, end_point, [], [], file_name='maze_no_path.svg')
+if __name__ == "__main__":
+    rows, cols = 40, 40
+
+    random_num_enemies = random.randint(1, 10) + 30
+    random_num_rewards = random.randint(1, 10) + 40
+
+    random_maze = MazeNode.generate_random_maze(rows, cols, num_enemies=random_num_enemies, num_rewards=random_num_rewards)
+    start_point = MazeNode.generate_start_on_border(rows, cols, random_maze)
+    while start_point is None:
+        # no start on the border can reach an end, draw a new maze instead of searching
+        random_maze = MazeNode.generate_random_maze(rows, cols, num_enemies=random_num_enemies, num_rewards=random_num_rewards)
+        start_point = MazeNode.generate_start_on_border(rows, cols, random_maze)
+    end_point = MazeNode.generate_end_on_border(rows, cols, start_point, random_maze)
+
+    try:
+        # the planner keeps its search state, so adding enemies only repairs the part of the path they touch
+        planner = IncrementalPlanner(random_maze, start_point, end_point)
+        shortest_path = planner.path()
+        num_enemies_along_path = 2
+        enemy_positions = random.sample(shortest_path, num_enemies_along_path)
+
+        for row, col in enemy_positions:
+            random_maze[row][col].is_enemy = True
+            planner.add_enemy(row, col)
+
+        new_shortest_path = planner.path()
+
+        path_stack = new_shortest_path.copy()
+        path_stack.append(start_point)
+        path_stack.append(end_point)
+        path_stack.extend(enemy_positions)
+        reward_locations = [(node.row, node.col) for row in random_maze for node in row if node.is_reward]
+        path_stack.extend(reward_locations)
+
+        print("Start Point:", start_point)
+        print("End Point:", end_point)
+        print("Number of Enemies:", random_num_enemies)
+        print("Number of Rewards:", random_num_rewards)
+        print("Shortest Path (Original):", shortest_path)
+        print("Shortest Path (Avoiding Enemies):", new_shortest_path)
+
+        MazeNode.visualize_maze_svg(random_maze, shortest_path, new_shortest_path, start_point, end_point, reward_locations, enemy_positions, file_name='maze_with_both_paths.svg')
+
+    except ValueError as e:
+        print(e)
+        MazeNode.visualize_maze_svg(random_maze, [], [], start_point, end_point, [], [], file_name='maze_no_path.svg')
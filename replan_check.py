@@ -0,0 +1,64 @@
+import random
+
+from maze_checks import or_none, path_length, walkable
+from maze_generators import generate_random_grid
+from maze_replan import IncrementalPlanner
+from maze_solvers import search, SolverWorkspace
+
+
+# Drops enemies onto (and later lifts them off) the current path of an
+# IncrementalPlanner, checks after every change that its distance matches a
+# fresh BFS and that its path is walkable, and counts what the repairs
+# expanded against searching again from scratch.
+def compare_replan(trials=300, rows=30, cols=30, changes=8, seed=0, open_probability=0.6):
+    picker = random.Random(seed)
+    report = {'trials': trials, 'checks': 0, 'mismatches': [], 'bad_paths': [],
+              'replan_expanded': 0, 'bfs_expanded': 0}
+
+    for trial in range(trials):
+        grid = generate_random_grid(rows, cols, num_enemies=rows * cols // 40, num_rewards=0,
+                                    seed=seed + trial, open_probability=open_probability)
+        start, end = (picker.randint(0, rows - 1), 0), (picker.randint(0, rows - 1), cols - 1)
+        if grid.is_enemy(grid.index(*start)):
+            continue
+        planner = IncrementalPlanner(grid, start, end)
+        workspace = SolverWorkspace(grid.size)
+        added = []
+
+        for change in range(changes + 1):
+            if change:
+                path = or_none(planner.path)
+                if change > changes // 2 and added:
+                    row, col = added.pop(picker.randrange(len(added)))
+                    planner.remove_enemy(row, col)
+                elif path is not None and len(path) > 2:
+                    row, col = path[picker.randint(1, len(path) - 2)]
+                    planner.add_enemy(row, col)
+                    added.append((row, col))
+                else:
+                    continue
+            before = planner.expanded
+            found = planner.distance()
+            expanded = planner.expanded - before
+            bfs_expanded, _ = search(grid, start, end, 'bfs', workspace=workspace)
+            expected = path_length(workspace, grid.index(*start), grid.index(*end), cols)
+            report['checks'] += 1
+            if (found if found != float('inf') else None) != expected:
+                report['mismatches'].append((seed + trial, change, expected, found))
+            elif expected is not None and not walkable(grid, or_none(planner.path), start, end):
+                report['bad_paths'].append((seed + trial, change))
+            if change:
+                report['replan_expanded'] += expanded
+                report['bfs_expanded'] += bfs_expanded
+
+    if report['bfs_expanded']:
+        report['saved'] = 1 - report['replan_expanded'] / report['bfs_expanded']
+    return report
+
+
+if __name__ == "__main__":
+    result = compare_replan()
+    print("checks:", result['checks'], "wrong distances:", len(result['mismatches']),
+          "bad paths:", len(result['bad_paths']),
+          "expanded after changes: %d vs bfs %d (%.1f%% fewer)" % (result['replan_expanded'], result['bfs_expanded'],
+                                                                    100 * result.get('saved', 0)))
@@ -0,0 +1,88 @@
+import itertools
+import random
+
+from maze_checks import or_none, walkable
+from maze_generators import generate_random_grid
+from maze_solvers import bfs
+from reward_planner import plan_reward_route
+
+
+# Plans reward routes on small seeded mazes and checks them against brute
+# force: every order of the reachable rewards, with BFS distances between
+# them. The Held-Karp route must be as short as the best order, and the
+# nearest neighbour + 2-opt one (exact_limit=0) is measured against it.
+# Every route must be walkable, avoid enemies and collect every reward that
+# can be collected. Some rewards sit under an enemy, which must be skipped.
+def compare_rewards(trials=300, rows=12, cols=12, rewards=6, seed=0, open_probability=0.65):
+    picker = random.Random(seed)
+    report = {'trials': trials, 'solvable': 0, 'mismatches': [], 'bad_routes': [],
+              'optimal_steps': 0, 'heuristic_steps': 0}
+
+    for trial in range(trials):
+        grid = generate_random_grid(rows, cols, num_enemies=rows * cols // 20, num_rewards=rewards,
+                                    seed=seed + trial, open_probability=open_probability)
+        if trial % 3 == 0:
+            row, col = picker.choice(grid.rewards())
+            grid.set_enemy(grid.index(row, col))
+        start, end = (picker.randint(0, rows - 1), 0), (picker.randint(0, rows - 1), cols - 1)
+        if grid.is_enemy(grid.index(*start)):
+            continue
+        expected = _brute_force(grid, start, end)
+        path, order = or_none(plan_reward_route, grid, start, end) or (None, None)
+        if expected is None or path is None:
+            if (expected is None) != (path is None):
+                report['mismatches'].append((seed + trial, expected, None if path is None else len(path) - 1))
+            continue
+
+        best, reachable = expected
+        report['solvable'] += 1
+        if len(path) - 1 != best:
+            report['mismatches'].append((seed + trial, best, len(path) - 1))
+        if not walkable(grid, path, start, end) or set(order) != reachable or not reachable <= set(path):
+            report['bad_routes'].append(seed + trial)
+        report['optimal_steps'] += best
+        _, heuristic_order = plan_reward_route(grid, start, end, exact_limit=0)
+        report['heuristic_steps'] += _route_length(grid, start, end, heuristic_order)
+
+    if report['optimal_steps']:
+        report['gap'] = report['heuristic_steps'] / report['optimal_steps'] - 1
+    return report
+
+
+def _brute_force(grid, start, end):
+    # (shortest route length, rewards on it) or None when end is out of reach
+    distance = _distance_function(grid)
+    if distance(start, end) is None:
+        return None
+    reachable = {cell for cell in grid.rewards() if cell not in (start, end) and
+                 distance(start, cell) is not None and distance(cell, end) is not None}
+    best = None
+    for order in itertools.permutations(reachable):
+        length = sum(distance(a, b) for a, b in zip((start,) + order, order + (end,)))
+        if best is None or length < best:
+            best = length
+    return best, reachable
+
+
+def _route_length(grid, start, end, order):
+    distance = _distance_function(grid)
+    route = [start] + list(order) + [end]
+    return sum(distance(a, b) for a, b in zip(route, route[1:]))
+
+
+def _distance_function(grid):
+    known = {}
+
+    def distance(a, b):
+        if (a, b) not in known:
+            shortest = or_none(bfs, grid, a, b)
+            known[(a, b)] = None if shortest is None else len(shortest) - 1
+        return known[(a, b)]
+    return distance
+
+
+if __name__ == "__main__":
+    result = compare_rewards()
+    print("solvable:", result['solvable'], "of", result['trials'],
+          "wrong lengths:", len(result['mismatches']), "bad routes:", len(result['bad_routes']),
+          "2-opt routes %.1f%% longer than optimal" % (100 * result.get('gap', 0)))
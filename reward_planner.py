@@ -0,0 +1,103 @@
+from distance_field import DistanceField, INF
+from maze_grid import as_grid
+from maze_solvers import NoPathError
+
+
+def plan_reward_route(maze, start, end, rewards=None, exact_limit=12):
+    # Route from start to end that picks up every reachable reward and never
+    # steps on an enemy. One BFS per point of interest gives all pairwise
+    # distances; the visiting order comes from Held-Karp for up to
+    # exact_limit rewards and from nearest neighbour + 2-opt above that.
+    # Returns the path and the rewards in the order they are collected.
+    grid = as_grid(maze)
+    if rewards is None:
+        rewards = grid.rewards()
+    rewards = [tuple(cell) for cell in rewards if tuple(cell) not in (tuple(start), tuple(end))]
+
+    end_field = DistanceField(grid, end)
+    if end_field.distance(start) == INF:
+        raise NoPathError("No path found")
+    # a reward the route can both reach and leave again towards the end; one
+    # under an enemy can be left but never entered, so it is skipped
+    rewards = [cell for cell in rewards
+               if not grid.is_enemy(grid.index(*cell)) and end_field.distance(cell) != INF]
+
+    points = [tuple(start)] + rewards + [tuple(end)]
+    fields = [DistanceField(grid, point) for point in points[:-1]] + [end_field]
+    distance = [[fields[j].distance(points[i]) for j in range(len(points))] for i in range(len(points))]
+
+    last = len(points) - 1
+    middle = list(range(1, last))
+    if len(middle) <= exact_limit:
+        order = _held_karp(distance, middle, last)
+    else:
+        order = _two_opt(distance, _nearest_neighbour(distance, middle), last)
+
+    route = [0] + order + [last]
+    path = [points[0]]
+    for here, there in zip(route, route[1:]):
+        path.extend(fields[there].path(points[here])[1:])
+    return path, [points[i] for i in order]
+
+
+def route_length(distance, order, last):
+    route = [0] + order + [last]
+    return sum(distance[a][b] for a, b in zip(route, route[1:]))
+
+
+def _held_karp(distance, middle, last):
+    # exact open path 0 -> every middle point -> last, O(2^k * k^2)
+    count = len(middle)
+    if not count:
+        return []
+    full = (1 << count) - 1
+    cost = {}
+    for i, point in enumerate(middle):
+        cost[(1 << i, i)] = (distance[0][point], None)
+    for subset in range(1, full + 1):
+        for i in range(count):
+            if not subset & (1 << i) or (subset, i) not in cost:
+                continue
+            so_far = cost[(subset, i)][0]
+            for j in range(count):
+                if subset & (1 << j):
+                    continue
+                key = (subset | (1 << j), j)
+                candidate = so_far + distance[middle[i]][middle[j]]
+                if key not in cost or candidate < cost[key][0]:
+                    cost[key] = (candidate, i)
+
+    best = min(range(count), key=lambda i: cost[(full, i)][0] + distance[middle[i]][last])
+    order = []
+    subset, i = full, best
+    while i is not None:
+        order.append(middle[i])
+        subset, i = subset & ~(1 << i), cost[(subset, i)][1]
+    order.reverse()
+    return order
+
+
+def _nearest_neighbour(distance, middle):
+    order = []
+    left = set(middle)
+    current = 0
+    while left:
+        current = min(left, key=lambda point: (distance[current][point], point))
+        order.append(current)
+        left.remove(current)
+    return order
+
+
+def _two_opt(distance, order, last):
+    # reverse any stretch of the route that makes it shorter, until none does
+    route = [0] + order + [last]
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(route) - 2):
+            for j in range(i + 1, len(route) - 1):
+                a, b, c, d = route[i - 1], route[i], route[j], route[j + 1]
+                if distance[a][c] + distance[b][d] < distance[a][b] + distance[c][d]:
+                    route[i:j + 1] = reversed(route[i:j + 1])
+                    improved = True
+    return route[1:-1]
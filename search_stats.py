@@ -0,0 +1,50 @@
+import contextlib
+import json
+import time
+
+
+class SearchStats:
+    # Counters and phase timers filled in by the solvers and generators when
+    # one is passed as stats=. Searches switch to separate instrumented copies
+    # of their loops, so leaving stats out costs nothing. Counts add up over
+    # every query the object is passed to.
+    #
+    # With a trace file, every sample-th expansion is written as a JSON line
+    # {"n", "row", "col", "cost", "frontier"} for offline analysis.
+    def __init__(self, trace=None, sample=1):
+        self.expanded = 0
+        self.pops = 0
+        self.stale_pops = 0
+        self.pushes = 0
+        self.relaxations = 0
+        self.frontier_peak = 0
+        # maze rows the generators have produced
+        self.rows = 0
+        self.phases = {}
+        self.trace = trace
+        self.sample = sample
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def record(self, expansion, index, cols, cost, frontier):
+        row, col = divmod(index, cols)
+        self.trace.write(json.dumps({'n': expansion, 'row': row, 'col': col, 'cost': cost,
+                                     'frontier': frontier}) + "\n")
+
+    def as_dict(self):
+        return {'expanded': self.expanded, 'pops': self.pops, 'stale_pops': self.stale_pops,
+                'pushes': self.pushes, 'relaxations': self.relaxations, 'frontier_peak': self.frontier_peak,
+                'rows': self.rows, 'phases': dict(self.phases)}
+
+
+def phase(stats, name):
+    # stats.phase(name), or a no-op when instrumentation is off
+    if stats is None:
+        return contextlib.nullcontext()
+    return stats.phase(name)
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import struct
+from collections import OrderedDict
+
+from maze_grid import as_grid
+from maze_solvers import NoPathError
+
+# two bits per step, four steps per byte
+STEP_CODES = {(0, -1): 0, (0, 1): 1, (-1, 0): 2, (1, 0): 3}
+CODE_STEPS = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+PATH_HEADER = struct.Struct('<III')
+NO_PATH = b''
+# keyword options that change how a solver runs but not what it returns
+UNKEYED = ('workspace', 'stats')
+
+
+class SolutionCache:
+    # Content addressed cache of solved paths. The key is a blake2b digest of
+    # the wall masks, the enemy plane, the endpoints and the solver with its
+    # options, so identical queries hit whatever object the maze lives in.
+    # Paths are kept compact (start cell plus two bits per step) in an LRU
+    # bounded by total bytes, optionally backed by a directory that survives
+    # across runs. "No path" answers (NoPathError) are cached too.
+    def __init__(self, max_bytes=64 << 20, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, maze, start, end, solver, *options, **keywords):
+        grid = as_grid(maze)
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(struct.pack('<IIIIII', grid.rows, grid.cols, start[0], start[1], end[0], end[1]))
+        described = (_stable(solver), tuple(_stable(option) for option in options))
+        # keyword options sorted by name, so the order they were passed in does not matter
+        named = sorted((name, _stable(value)) for name, value in keywords.items() if name not in UNKEYED)
+        if named:
+            described += (tuple(named),)
+        digest.update(repr(described).encode())
+        digest.update(grid.walls)
+        digest.update(grid.enemy)
+        return digest.digest()
+
+    def solve(self, solver, maze, start, end, *options, **keywords):
+        # solver(maze, start, end, *options, **keywords), e.g. maze_solvers.bfs or astar
+        grid = as_grid(maze)
+        key = self.key(grid, start, end, solver, *options, **keywords)
+        data = self.get(key)
+        if data is None:
+            try:
+                path = solver(grid, start, end, *options, **keywords)
+            except NoPathError:
+                # only a search that ran and found nothing is remembered,
+                # bad arguments raise every time
+                path = None
+            data = encode_path(path)
+            self.put(key, data)
+        if data == NO_PATH:
+            raise NoPathError("No path found")
+        return decode_path(data)
+
+    def wrap(self, solver):
+        # a drop in replacement for solver that goes through the cache
+        def cached(maze, start, end, *options, **keywords):
+            return self.solve(solver, maze, start, end, *options, **keywords)
+        cached.__name__ = getattr(solver, '__name__', 'cached')
+        return cached
+
+    def get(self, key):
+        data = self.entries.get(key)
+        if data is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return data
+        data = self._read(key)
+        if data is not None:
+            self.disk_hits += 1
+            self._remember(key, data)
+            return data
+        self.misses += 1
+        return None
+
+    def put(self, key, data):
+        self._remember(key, data)
+        if self.directory is not None:
+            name = self._file(key)
+            with open(name + '.tmp', 'wb') as out:
+                out.write(data)
+            os.replace(name + '.tmp', name)
+
+    def _remember(self, key, data):
+        if key in self.entries:
+            self.bytes -= len(self.entries.pop(key))
+        self.entries[key] = data
+        self.bytes += len(data)
+        while self.bytes > self.max_bytes and len(self.entries) > 1:
+            _, dropped = self.entries.popitem(last=False)
+            self.bytes -= len(dropped)
+            self.evictions += 1
+
+    def _file(self, key):
+        return os.path.join(self.directory, key.hex() + '.path')
+
+    def _read(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self._file(key), 'rb') as source:
+                return source.read()
+        except FileNotFoundError:
+            return None
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {'entries': len(self.entries), 'bytes': self.bytes, 'hits': self.hits,
+                'disk_hits': self.disk_hits, 'misses': self.misses, 'evictions': self.evictions,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0}
+
+
+def encode_path(path):
+    if path is None:
+        return NO_PATH
+    packed = bytearray((len(path) + 2) // 4)
+    for step, (previous, current) in enumerate(zip(path, path[1:])):
+        code = STEP_CODES[(current[0] - previous[0], current[1] - previous[1])]
+        packed[step >> 2] |= code << ((step & 3) << 1)
+    return PATH_HEADER.pack(path[0][0], path[0][1], len(path)) + bytes(packed)
+
+
+def decode_path(data):
+    row, col, length = PATH_HEADER.unpack_from(data)
+    packed = data[PATH_HEADER.size:]
+    path = [(row, col)]
+    for step in range(length - 1):
+        row_step, col_step = CODE_STEPS[packed[step >> 2] >> ((step & 3) << 1) & 3]
+        row += row_step
+        col += col_step
+        path.append((row, col))
+    return path
+
+
+def _stable(value):
+    # functions go into the key by name: their repr holds a memory address
+    # that changes from run to run and would miss the on disk cache
+    if callable(value):
+        return getattr(value, '__module__', None), getattr(value, '__qualname__', getattr(value, '__name__', None))
+    return value
@@ -0,0 +1,215 @@
+import heapq
+import math
+import random
+import time
+
+from maze_generators import generate
+from maze_grid import as_grid
+from maze_solvers import manhattan, NoPathError, search, SolverWorkspace
+
+
+# above this the table period is too long to close states on (cell, t % period)
+PERIOD_LIMIT = 10000
+
+
+class ReservationTable:
+    # Where the patrolling enemies are at every tick. Each patrol is a cyclic
+    # route of cells, one per tick, so a patrol of length n is at
+    # route[t % n]. Routes are grouped by length and every group keeps, per
+    # phase, the cells it occupies and the moves an agent could not swap
+    # through, so memory follows the total route length. The whole table
+    # repeats every period = lcm of the route lengths.
+    def __init__(self, patrols, cols):
+        self.cols = cols
+        self.period = 1
+        # route length -> ([occupied cells per phase], [moves per phase])
+        self.groups = {}
+        for route in patrols:
+            length = len(route)
+            self.period = self.period * length // math.gcd(self.period, length)
+            if length not in self.groups:
+                self.groups[length] = ([set() for _ in range(length)], [set() for _ in range(length)])
+            occupied, moves = self.groups[length]
+            cells = [row * cols + col for row, col in route]
+            for phase in range(length):
+                here = cells[phase]
+                after = cells[(phase + 1) % length]
+                occupied[phase].add(here)
+                if here != after:
+                    moves[phase].add((here, after))
+
+    def occupied_at(self, t):
+        cells = set()
+        for length, (occupied, _) in self.groups.items():
+            cells |= occupied[t % length]
+        return cells
+
+    def is_occupied(self, index, t):
+        return any(index in occupied[t % length] for length, (occupied, _) in self.groups.items())
+
+    def blocked(self, current, following, t):
+        # stepping current -> following between t and t + 1 hits an enemy, or
+        # passes one that makes the opposite move at the same time
+        for length, (occupied, moves) in self.groups.items():
+            phase = t % length
+            if following in occupied[(phase + 1) % length] or (following, current) in moves[phase]:
+                return True
+        return False
+
+
+class SpaceTimePlanner:
+    # A* over (cell, t) states, with a wait action, against enemies that walk
+    # fixed patrol routes. Static enemies on the grid stay walls. Because
+    # the reservation table repeats, reaching a cell at an earlier tick of the
+    # same phase dominates any later arrival, so states are closed on
+    # (cell, t mod period) and the search terminates even when the goal
+    # cannot be reached. When the period is over PERIOD_LIMIT states are
+    # closed on (cell, t) instead and the search stops at max_time, which
+    # then defaults to start_time + PERIOD_LIMIT + the number of cells.
+    def __init__(self, maze, patrols):
+        self.grid = as_grid(maze)
+        self.table = ReservationTable(patrols, self.grid.cols)
+        self.expanded = 0
+
+    def plan(self, start, end, start_time=0, max_time=None):
+        # the cell occupied at every tick from start_time until end is reached
+        grid, table = self.grid, self.table
+        neighbors = grid.neighbors
+        cols = grid.cols
+        if table.period <= PERIOD_LIMIT:
+            period = table.period
+        else:
+            # no phase dominance, every tick is its own state
+            period = 0
+            if max_time is None:
+                max_time = start_time + PERIOD_LIMIT + grid.size
+        source = start[0] * cols + start[1]
+        target = end[0] * cols + end[1]
+        end_row, end_col = end
+        if table.is_occupied(source, start_time):
+            raise ValueError("Start is occupied at t=%d" % start_time)
+
+        parent = {(source, start_time): None}
+        closed = set()
+        frontier = [(manhattan(abs(start[0] - end_row), abs(start[1] - end_col)), -start_time, source)]
+        while frontier:
+            _, negative_t, current = heapq.heappop(frontier)
+            t = -negative_t
+            state = (current, t % period if period else t)
+            if state in closed:
+                continue
+            closed.add(state)
+            self.expanded += 1
+            if current == target:
+                return self._path((current, t), parent, cols)
+            if max_time is not None and t >= max_time:
+                continue
+            for following in [current] + neighbors(current):
+                if table.blocked(current, following, t) or \
+                        (following, (t + 1) % period if period else t + 1) in closed:
+                    continue
+                if (following, t + 1) not in parent:
+                    parent[(following, t + 1)] = (current, t)
+                    row, col = divmod(following, cols)
+                    heapq.heappush(frontier, (t + 1 + manhattan(abs(row - end_row), abs(col - end_col)), -t - 1,
+                                              following))
+        raise NoPathError("No path found")
+
+    def _path(self, state, parent, cols):
+        path = []
+        while state is not None:
+            path.append(divmod(state[0], cols))
+            state = parent[state]
+        path.reverse()
+        return path
+
+
+def ping_pong(walk):
+    # a patrol that walks a route and back again, as a cyclic route
+    return list(walk) + list(walk[-2:0:-1])
+
+
+def random_patrols(maze, count, length=10, seed=None, avoid=()):
+    # count random walks of up to length steps through open passages
+    grid = as_grid(maze)
+    picker = random.Random(seed)
+    blocked = {grid.index(row, col) for row, col in avoid}
+    patrols = []
+    while len(patrols) < count:
+        current = picker.randrange(grid.size)
+        if current in blocked or grid.is_enemy(current):
+            continue
+        walk = [current]
+        for _ in range(length - 1):
+            options = [n for n in grid.neighbors(current) if n not in blocked]
+            if not options:
+                break
+            current = picker.choice(options)
+            walk.append(current)
+        patrols.append(ping_pong([grid.cell(index) for index in walk]))
+    return patrols
+
+
+def replan_every_tick(maze, patrols, start, end, max_ticks=10000):
+    # Baseline: every tick, treat the enemies where they stand as static,
+    # re-run astar from the current cell and take one step (or wait when
+    # there is no path). It can walk into an enemy that moves onto it.
+    grid = as_grid(maze).copy()
+    cols = grid.cols
+    table = ReservationTable(patrols, cols)
+    workspace = SolverWorkspace(grid.size)
+    current = start[0] * cols + start[1]
+    target = end[0] * cols + end[1]
+    report = {'expanded': 0, 'ticks': 0, 'reached': False, 'collisions': 0, 'tick_seconds': []}
+    path = [start]
+    standing = set()
+    for t in range(max_ticks):
+        if current == target:
+            report['reached'] = True
+            break
+        started = time.perf_counter()
+        here = table.occupied_at(t)
+        for index in standing - here:
+            grid.set_enemy(index, False)
+        for index in here - standing:
+            grid.set_enemy(index)
+        standing = set(here)
+        report['expanded'] += search(grid, divmod(current, cols), end, 'astar', workspace=workspace)[0]
+        if workspace.reached(target):
+            step = workspace.path(current, target, cols)[1]
+            current = step[0] * cols + step[1]
+        report['tick_seconds'].append(time.perf_counter() - started)
+        report['ticks'] += 1
+        report['collisions'] += table.blocked(path[-1][0] * cols + path[-1][1], current, t)
+        path.append(divmod(current, cols))
+    report['path'] = path
+    return report
+
+
+def compare_with_replanning(maze, patrols, start, end, max_ticks=10000):
+    planner = SpaceTimePlanner(maze, patrols)
+    started = time.perf_counter()
+    path = planner.plan(start, end)
+    seconds = time.perf_counter() - started
+    ticks = len(path) - 1
+    baseline = replan_every_tick(maze, patrols, start, end, max_ticks)
+    tick_seconds = baseline['tick_seconds']
+    return {
+        'space_time': {'expanded': planner.expanded, 'seconds': seconds, 'ticks': ticks,
+                       'seconds_per_tick': seconds / max(1, ticks), 'collisions': 0},
+        'replan': {'expanded': baseline['expanded'], 'seconds': sum(tick_seconds), 'ticks': baseline['ticks'],
+                   'seconds_per_tick': sum(tick_seconds) / max(1, len(tick_seconds)),
+                   'worst_tick_seconds': max(tick_seconds, default=0.0), 'reached': baseline['reached'],
+                   'collisions': baseline['collisions']},
+    }
+
+
+if __name__ == "__main__":
+    rows, cols = 80, 80
+    maze = generate('kruskal', rows, cols, num_enemies=0, num_rewards=0, seed=7, braid=0.5)
+    start, end = (0, 0), (rows - 1, cols - 1)
+    patrols = random_patrols(maze, 60, length=12, seed=7, avoid=(start, end))
+    result = compare_with_replanning(maze, patrols, start, end)
+    for name, row in result.items():
+        print("%-10s ticks %5d  expanded %8d  %.3f ms/tick  collisions %d"
+              % (name, row['ticks'], row['expanded'], 1000 * row['seconds_per_tick'], row['collisions']))
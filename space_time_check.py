@@ -0,0 +1,101 @@
+import math
+import random
+
+import space_time
+from maze_generators import generate
+from maze_solvers import NoPathError
+from space_time import random_patrols, SpaceTimePlanner
+
+
+# Plans against patrolling enemies on small seeded mazes and checks every
+# plan against brute force: a BFS over (cell, t) layers up to
+# period * cells ticks, with enemy positions read straight off the patrol
+# routes. Arrival ticks must match, and the plan must only wait or step
+# through open passages without meeting or swapping with an enemy. Every
+# other trial lowers PERIOD_LIMIT so the planner closes states on (cell, t).
+def compare_space_time(trials=300, rows=8, cols=8, patrols=4, seed=0):
+    picker = random.Random(seed)
+    report = {'trials': trials, 'solvable': 0, 'mismatches': [], 'bad_plans': []}
+
+    for trial in range(trials):
+        maze = generate('kruskal', rows, cols, num_enemies=rows * cols // 30, num_rewards=0,
+                        seed=seed + trial, braid=0.5)
+        start, end = (picker.randint(0, rows - 1), 0), (picker.randint(0, rows - 1), cols - 1)
+        routes = [random_patrols(maze, 1, length=picker.randint(1, 5), seed=picker.random(), avoid=(start, end))[0]
+                  for _ in range(patrols)]
+        if maze.is_enemy(maze.index(*start)) or start in _enemy_cells(routes, 0):
+            continue
+        horizon = _period(routes) * maze.size
+        expected = _brute_force(maze, routes, start, end, horizon)
+
+        planner = SpaceTimePlanner(maze, routes)
+        limit = space_time.PERIOD_LIMIT
+        if trial % 2:
+            space_time.PERIOD_LIMIT = 0
+        try:
+            path = planner.plan(start, end, max_time=horizon if trial % 2 else None)
+        except NoPathError:
+            path = None
+        finally:
+            space_time.PERIOD_LIMIT = limit
+
+        found = None if path is None else len(path) - 1
+        if found != expected:
+            report['mismatches'].append((seed + trial, expected, found))
+        elif path is not None:
+            report['solvable'] += 1
+            if not _valid(maze, routes, path, start, end):
+                report['bad_plans'].append(seed + trial)
+
+    return report
+
+
+def _period(routes):
+    period = 1
+    for route in routes:
+        period = period * len(route) // math.gcd(period, len(route))
+    return period
+
+
+def _enemy_cells(routes, t):
+    return {route[t % len(route)] for route in routes}
+
+
+def _moves(maze, cell):
+    row, col = cell
+    return [cell] + [maze.cell(index) for index in maze.neighbors(maze.index(row, col))]
+
+
+def _safe(routes, here, there, t):
+    # no enemy on there at t + 1 and none coming the other way
+    for route in routes:
+        length = len(route)
+        now, after = route[t % length], route[(t + 1) % length]
+        if after == there or (now == there and after == here and here != there):
+            return False
+    return True
+
+
+def _brute_force(maze, routes, start, end, horizon):
+    # first tick at which end can be reached, None when never within horizon
+    layer = {start}
+    for t in range(horizon + 1):
+        if end in layer:
+            return t
+        layer = {there for here in layer for there in _moves(maze, here) if _safe(routes, here, there, t)}
+        if not layer:
+            return None
+    return None
+
+
+def _valid(maze, routes, path, start, end):
+    if path[0] != start or path[-1] != end:
+        return False
+    return all(there in _moves(maze, here) and _safe(routes, here, there, t)
+               for t, (here, there) in enumerate(zip(path, path[1:])))
+
+
+if __name__ == "__main__":
+    result = compare_space_time()
+    print("solvable:", result['solvable'], "of", result['trials'],
+          "wrong arrival ticks:", len(result['mismatches']), "bad plans:", len(result['bad_plans']))
@@ -1,6 +1,7 @@
-import os 
-from time import sleep
-for i in range(10):
-    os.system("python maze_with_enemies.py")
-    sleep(2)
-    os.system("clear")
\ No newline at end of file
+from batch_runner import run_batch
+
+# generator and solver are imported once and the runs share a process pool,
+# instead of starting a fresh interpreter per maze
+if __name__ == "__main__":
+    solvable = run_batch(10, output='batch_results.jsonl')
+    print(solvable, "of 10 mazes solvable, details in batch_results.jsonl")
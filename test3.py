@@ -2,6 +2,8 @@ import random
 import svgwrite
 import heapq
 
+from maze_png import export_png
+
 class MazeNode:
     def __init__(self, row, col):
         self.row = row
@@ -138,4 +140,4 @@ end_point = MazeNode.generate_end_on_border(rows, cols, start_point)
 
 # to store and view generated maze.
 MazeNode.visualize_maze_svg(random_maze, [], [], start_point, end_point, [], [], file_name='maze.svg')
-MazeNode.visualize_maze_svg(random_maze, [], [], start_point, end_point, [], [], file_name='maze.img')
+export_png(random_maze, [], [], start_point, end_point, [], [], file_name='maze.png')
@@ -1,7 +1,10 @@
 import random
 import svgwrite
-import heapq
-import math
+
+from maze_components import DisjointSet, pick_end, pick_start
+from maze_grid import MazeGrid
+from maze_replan import IncrementalPlanner
+from maze_path import Path
 
 
 class MazeNode:
@@ -16,21 +19,31 @@ class MazeNode:
         self.visited = False
         self.is_enemy = False
         self.is_reward = False
+        self.component = None
 
     def __lt__(self, other):
         return self.distance < other.distance
 
 def generate_random_maze(rows, cols, num_enemies=10, num_rewards=5):
     maze = [[MazeNode(row, col) for col in range(cols)] for row in range(rows)]
+    components = DisjointSet(rows * cols)
 
     for row in range(rows):
         for col in range(cols):
             if col < cols - 1 and random.choice([True, False]):
                 maze[row][col].right = maze[row][col + 1]
                 maze[row][col + 1].left = maze[row][col]
+                components.union(row * cols + col, row * cols + col + 1)
             if row < rows - 1 and random.choice([True, False]):
                 maze[row][col].down = maze[row + 1][col]
                 maze[row + 1][col].up = maze[row][col]
+                components.union(row * cols + col, (row + 1) * cols + col)
+
+    # connectivity is known up front, no need to search to find out there is no path
+    components.compress()
+    for row in maze:
+        for node in row:
+            node.component = components.parent[node.row * cols + node.col]
 
     for _ in range(num_enemies):
         enemy_row = random.randint(0, rows - 1)
@@ -44,10 +57,15 @@ def generate_random_maze(rows, cols, num_enemies=10, num_rewards=5):
 
     return maze
 
-def generate_start_on_border(rows, cols):
+def generate_start_on_border(rows, cols, maze=None):
+    if maze is not None:
+        # only starts whose component reaches an end cell, None if there is none
+        return pick_start(lambda row, col: maze[row][col].component, rows, cols)
     return (random.randint(1, rows - 2), 0)
 
-def generate_end_on_border(rows, cols, start):
+def generate_end_on_border(rows, cols, start, maze=None):
+    if maze is not None:
+        return pick_end(lambda row, col: maze[row][col].component, rows, cols, start)
     side = random.choice(["top", "bottom", "left", "right"])
     if side == "top" and start[0] != 0:
         return (0, random.randint(1, cols - 2))
@@ -60,58 +78,23 @@ def generate_end_on_border(rows, cols, start):
     else:
         return generate_end_on_border(rows, cols, start)
 
-def heuristic(node, end):
-    return math.sqrt(abs((node.row - end[0]) * 2 + (node.col - end[1]) * 2))
-
-def astar(maze, start, end):
-    for row in maze:
-        for node in row:
-            node.visited = False
-            node.distance = float('inf')
-
-    start_node = maze[start[0]][start[1]]
-    end_node = maze[end[0]][end[1]]
-
-    priority_queue = [(0 + heuristic(start_node, end), 0, start_node)]
-
-    while priority_queue:
-        current_f, current_g, current_node = heapq.heappop(priority_queue)
-
-        if current_node.visited:
-            continue
-
-        current_node.visited = True
-        current_node.distance = current_g
-
-        neighbors = [current_node.left, current_node.right, current_node.up, current_node.down]
-        for neighbor in filter(None, neighbors):
-            if not neighbor.visited and not neighbor.is_enemy:
-                new_g = current_g + 1
-                if new_g < neighbor.distance:
-                    neighbor.distance = new_g
-                    heapq.heappush(priority_queue, (new_g + heuristic(neighbor, end), new_g, neighbor))
-
-    if end_node.distance == float('inf'):
+def replan(planner):
+    # the planner's current shortest path, None when the enemies cut it off
+    try:
+        return Path.from_cells(planner.path())
+    except ValueError:
         return None
 
-    path = []
-    current_node = end_node
-    while current_node != start_node:
-        path.append((current_node.row, current_node.col))
-        neighbors = [current_node.left, current_node.right, current_node.up, current_node.down]
-        valid_neighbors = [n for n in neighbors if n and not n.is_enemy]
-        current_node = min(valid_neighbors, key=lambda x: x.distance)
-
-    path.append((start_node.row, start_node.col))
-    return list(reversed(path))
-
-def add_enemies_along_path(maze, path, num_enemies):
+def add_enemies_along_path(maze, path, num_enemies, planner=None):
+    # planner, when given, is told about every enemy so it can repair its path
     enemies_added = 0
     for _ in range(num_enemies):
         random_index = random.randint(1, len(path) - 2)
         row, col = path[random_index]
         if not maze[row][col].is_enemy:
             maze[row][col].is_enemy = True
+            if planner is not None:
+                planner.add_enemy(row, col)
             enemies_added += 1
     return enemies_added
 
@@ -188,21 +171,28 @@ def generate_a_new_maze():
     print("Generating a new maze")
     random_maze = generate_random_maze(rows, cols, num_enemies=random_num_enemies, num_rewards=10)
     # increase number of rewards in maze.
-    start_point = generate_start_on_border(rows, cols)
-    end_point = generate_end_on_border(rows, cols, start_point)
+    start_point = generate_start_on_border(rows, cols, random_maze)
+    if start_point is None:
+        print("No path found from start to end.")
+        return False
+    end_point = generate_end_on_border(rows, cols, start_point, random_maze)
 
     try:
-        shortest_path = astar(random_maze, start_point, end_point)
+        # converted once: searching the list of nodes would rebuild the grid on every call.
+        # The planner keeps its search state, so the enemies added below only
+        # repair the part of the path they touch instead of searching again.
+        planner = IncrementalPlanner(MazeGrid.from_nodes(random_maze), start_point, end_point)
+        shortest_path = replan(planner)
 
         if shortest_path is not None:
             # Add two enemies randomly along the path
-            enemies_added = add_enemies_along_path(random_maze, shortest_path, num_enemies=2)
+            enemies_added = add_enemies_along_path(random_maze, shortest_path, num_enemies=2, planner=planner)
 
             if enemies_added == 2:
-                new_shortest_path = astar(random_maze, start_point, end_point)
+                new_shortest_path = replan(planner)
 
                 if new_shortest_path is not None:
-                    path_stack = new_shortest_path.copy()
+                    path_stack = new_shortest_path.to_list()
                     path_stack.append(start_point)
                     path_stack.append(end_point)
                     reward_locations = [(node.row, node.col) for row in random_maze for node in row if node.is_reward]
@@ -211,41 +201,40 @@ def generate_a_new_maze():
                     print("\nStart Point:", start_point)
                     print("End Point:", end_point)
                     print("Number of Enemies:", random_num_enemies)
-                    print("Shortest Path (Original):", shortest_path)
-                    print("Shortest Path (Avoiding Enemies):", new_shortest_path)
-                    repoi=0   # declaring to count rewards on path
-                    for i in shortest_path:
-                        if i in reward_locations:
-                            repoi+=1      # increase with number of rewards on path.
+                    print("Shortest Path (Original):", shortest_path.to_list())
+                    print("Shortest Path (Avoiding Enemies):", new_shortest_path.to_list())
+                    # rewards on the path, a set lookup per cell instead of a list scan
+                    repoi = len(shortest_path.intersection(reward_locations))
                     print("reward points in shortest path = ",repoi) # return the total number of reward points crossed in shortest path.
 
                     # to find rewards in new shortest path. 
-                    rewne=0
-                    for i in new_shortest_path:
-                        if i in reward_locations:
-                            rewne+=1
+                    rewne = len(new_shortest_path.intersection(reward_locations))
 
                     print("rewards in new path = ",rewne)   # return the number of rewards in new shortest path. 
 
 
-                    visualize_maze_svg(random_maze, shortest_path, start_point, end_point, reward_locations, new_shortest_path,
-                                        file_name='maze_with_paths.svg')
+                    visualize_maze_svg(random_maze, shortest_path.to_list(), start_point, end_point, reward_locations,
+                                       new_shortest_path.to_list(), file_name='maze_with_paths.svg')
 
     
 
                 else:
                     print("No path found after adding enemies.")
-                    generate_a_new_maze()
+                    return False
 
             else:
                 print("Failed to add enemies along the path.")
-                generate_a_new_maze()
+                return False
 
         else:
             print("No path found from start to end.")
-            generate_a_new_maze()
+            return False
 
     except ValueError as e:
         print("Error: " + str(e))
 
-generate_a_new_maze()
\ No newline at end of file
+    return True
+
+# retry in a loop, recursing on every failed maze could blow the stack
+while not generate_a_new_maze():
+    pass
@@ -0,0 +1,345 @@
+import struct
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from maze_grid import MazeGrid, LEFT, RIGHT, UP, DOWN, ALL_WALLS
+from maze_solvers import bfs, NoPathError
+
+# File layout, all little endian:
+#   header   magic, version, rows, cols, tile size, seed, start row/col, end
+#            row/col (-1 for anything unknown), padded to HEADER_SIZE
+#   tiles    row major over the tile grid, every one tile_size x tile_size
+#            cells and the same number of bytes, so tile n starts at
+#            HEADER_SIZE + n * tile_bytes. A tile is its wall mask bytes
+#            (row major, cells past the maze edge are ALL_WALLS) followed by
+#            its enemy and reward bit planes.
+MAGIC = b'MZTL'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIIqiiii')
+HEADER_SIZE = 64
+DEFAULT_TILE = 64
+
+
+def write_tiled(file_name, rows, cols, row_iter, tile_size=DEFAULT_TILE, seed=None, start=None, end=None):
+    # Streams (walls, enemy, reward) rows, e.g. from maze_stream.eller_rows,
+    # into a tiled file. Only one band of tile_size rows is held at a time.
+    tile_cols = (cols + tile_size - 1) // tile_size
+    width = tile_cols * tile_size
+    band_walls = np.full((tile_size, width), ALL_WALLS, dtype=np.uint8)
+    band_enemy = np.zeros((tile_size, width), dtype=bool)
+    band_reward = np.zeros((tile_size, width), dtype=bool)
+    written = 0
+    with open(file_name, 'wb') as out:
+        out.write(_header(rows, cols, tile_size, seed, start, end))
+        for row, (walls, enemy, reward) in enumerate(row_iter):
+            line = row % tile_size
+            band_walls[line, :cols] = np.frombuffer(bytes(walls), dtype=np.uint8)
+            band_enemy[line, :cols] = _unpack_row(enemy, cols)
+            band_reward[line, :cols] = _unpack_row(reward, cols)
+            written += 1
+            if line == tile_size - 1 or written == rows:
+                if line < tile_size - 1:
+                    # the last band is cut short, pad it below the maze
+                    band_walls[line + 1:] = ALL_WALLS
+                    band_enemy[line + 1:] = False
+                    band_reward[line + 1:] = False
+                for left in range(0, width, tile_size):
+                    out.write(band_walls[:, left:left + tile_size].tobytes())
+                    out.write(np.packbits(band_enemy[:, left:left + tile_size], bitorder='little').tobytes())
+                    out.write(np.packbits(band_reward[:, left:left + tile_size], bitorder='little').tobytes())
+        if written != rows:
+            raise ValueError("Expected %d rows, got %d" % (rows, written))
+
+
+def save_tiled(grid, file_name, tile_size=DEFAULT_TILE, start=None, end=None, seed=None):
+    # an in memory MazeGrid as a tiled file
+    write_tiled(file_name, grid.rows, grid.cols, _grid_rows(grid), tile_size,
+                seed if seed is not None else grid.seed, start, end)
+
+
+class TiledMaze:
+    # A maze read from a tiled file through an LRU cache of cache_tiles tiles,
+    # with the MazeGrid interface the solvers use (rows, cols, size, index,
+    # neighbors, open_neighbors, is_enemy, set_enemy). A tile is read the
+    # first time a cell in it is touched and dropped again when the cache is
+    # full, so memory stays at cache_tiles tiles whatever the maze size.
+    #
+    # Enemy and reward changes are written back on eviction and by flush()
+    # when the file was opened writable; otherwise changed tiles are kept in
+    # memory and never reread. hits, misses and bytes_read count tile
+    # lookups; stats() / reset_stats() report them per query.
+
+    # the solvers keep their search state in dicts instead of per cell arrays
+    sparse = True
+
+    def __init__(self, file_name, cache_tiles=256, writable=False):
+        self.file = open(file_name, 'r+b' if writable else 'rb', buffering=0)
+        self.writable = writable
+        (self.rows, self.cols, self.tile_size, self.seed, self.start,
+         self.end) = _read_header(self.file.read(HEADER_SIZE))
+        tile = self.tile_size
+        self.tile_cols = (self.cols + tile - 1) // tile
+        self.tile_cells = tile * tile
+        self.plane = (self.tile_cells + 7) // 8
+        self.tile_bytes = self.tile_cells + 2 * self.plane
+        self.cache_tiles = cache_tiles
+        # tile id -> [walls, enemy, reward]
+        self.cache = OrderedDict()
+        self.dirty = set()
+        self.kept = {}
+        self.components = None
+        self._last_id = -1
+        self._last = None
+        # for every wall mask, (side, step in the maze, step in the tile) of the open sides
+        sides = ((LEFT, -1, -1), (RIGHT, 1, 1), (UP, -self.cols, -tile), (DOWN, self.cols, tile))
+        self._sides = [tuple(entry for entry in sides if not mask & entry[0]) for mask in range(16)]
+        self.reset_stats()
+
+    @property
+    def size(self):
+        return self.rows * self.cols
+
+    def index(self, row, col):
+        return row * self.cols + col
+
+    def cell(self, index):
+        return divmod(index, self.cols)
+
+    # tile cache
+
+    def _tile(self, tile_id):
+        if tile_id == self._last_id:
+            self.hits += 1
+            return self._last
+        tile = self.cache.get(tile_id)
+        if tile is not None:
+            self.hits += 1
+            self.cache.move_to_end(tile_id)
+        else:
+            tile = self.kept.pop(tile_id, None)
+            if tile is None:
+                tile = self._read(tile_id)
+            else:
+                self.hits += 1
+            self.cache[tile_id] = tile
+            if len(self.cache) > self.cache_tiles:
+                self._evict()
+        self._last_id, self._last = tile_id, tile
+        return tile
+
+    def _read(self, tile_id):
+        self.misses += 1
+        self.file.seek(HEADER_SIZE + tile_id * self.tile_bytes)
+        data = self.file.read(self.tile_bytes)
+        if len(data) != self.tile_bytes:
+            raise ValueError("Truncated maze file %s" % self.file.name)
+        self.bytes_read += len(data)
+        cells, plane = self.tile_cells, self.plane
+        return [bytearray(data[:cells]), bytearray(data[cells:cells + plane]), bytearray(data[cells + plane:])]
+
+    def _evict(self):
+        tile_id, tile = self.cache.popitem(last=False)
+        if tile_id == self._last_id:
+            self._last_id = -1
+        if tile_id in self.dirty:
+            if self.writable:
+                self._write(tile_id, tile)
+            else:
+                self.kept[tile_id] = tile
+
+    def _write(self, tile_id, tile):
+        self.file.seek(HEADER_SIZE + tile_id * self.tile_bytes)
+        self.file.write(b''.join(tile))
+        self.dirty.discard(tile_id)
+
+    def flush(self):
+        if self.writable:
+            for tile_id in list(self.dirty):
+                if tile_id in self.cache:
+                    self._write(tile_id, self.cache[tile_id])
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _locate(self, index):
+        # (tile, index inside the tile) of a cell
+        row, col = divmod(index, self.cols)
+        tile = self.tile_size
+        return (self._tile((row // tile) * self.tile_cols + col // tile),
+                (row % tile) * tile + col % tile)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else None,
+                'bytes_read': self.bytes_read, 'cached_tiles': len(self.cache), 'tile_bytes': self.tile_bytes}
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+
+    # the MazeGrid interface
+
+    def open_neighbors(self, index):
+        tile, local = self._locate(index)
+        return [index + step for _, step, _ in self._sides[tile[0][local]]]
+
+    def neighbors(self, index):
+        # neighbours a solver may step into: open passage and not an enemy.
+        # Only a step over the tile's edge needs a second tile lookup.
+        tile = self.tile_size
+        row, col = divmod(index, self.cols)
+        tile_row, local_row = divmod(row, tile)
+        tile_col, local_col = divmod(col, tile)
+        walls, enemy, _ = self._tile(tile_row * self.tile_cols + tile_col)
+        local = local_row * tile + local_col
+        edges = ((LEFT if local_col == 0 else 0) | (RIGHT if local_col == tile - 1 else 0)
+                 | (UP if local_row == 0 else 0) | (DOWN if local_row == tile - 1 else 0))
+        found = []
+        for side, step, local_step in self._sides[walls[local]]:
+            if side & edges:
+                if not self.is_enemy(index + step):
+                    found.append(index + step)
+            else:
+                bit = local + local_step
+                if not enemy[bit >> 3] >> (bit & 7) & 1:
+                    found.append(index + step)
+        return found
+
+    def is_enemy(self, index):
+        tile, local = self._locate(index)
+        return bool(tile[1][local >> 3] >> (local & 7) & 1)
+
+    def set_enemy(self, index, value=True):
+        self._set(index, 1, value)
+
+    def is_reward(self, index):
+        tile, local = self._locate(index)
+        return bool(tile[2][local >> 3] >> (local & 7) & 1)
+
+    def set_reward(self, index, value=True):
+        self._set(index, 2, value)
+
+    def _set(self, index, plane, value):
+        row, col = divmod(index, self.cols)
+        tile = self.tile_size
+        tile_id = (row // tile) * self.tile_cols + col // tile
+        local = (row % tile) * tile + col % tile
+        bits = self._tile(tile_id)[plane]
+        if value:
+            bits[local >> 3] |= 1 << (local & 7)
+        else:
+            bits[local >> 3] &= ~(1 << (local & 7)) & 0xFF
+        self.dirty.add(tile_id)
+
+    def window(self, top, left, rows, cols):
+        # rows x cols cells from (top, left) as an in memory MazeGrid, with the
+        # window's outer walls closed, e.g. for export_png or render_svg
+        grid = MazeGrid(rows, cols, seed=self.seed)
+        walls = grid.walls
+        tile = self.tile_size
+        for row in range(rows):
+            source_row = top + row
+            col = 0
+            while col < cols:
+                source_col = left + col
+                walls_, enemy, reward = self._tile((source_row // tile) * self.tile_cols + source_col // tile)
+                local = (source_row % tile) * tile + source_col % tile
+                count = min(tile - source_col % tile, cols - col)
+                base = row * cols + col
+                walls[base:base + count] = walls_[local:local + count]
+                for offset in range(count):
+                    bit = local + offset
+                    if enemy[bit >> 3] >> (bit & 7) & 1:
+                        grid.set_enemy(base + offset)
+                    if reward[bit >> 3] >> (bit & 7) & 1:
+                        grid.set_reward(base + offset)
+                col += count
+        for col in range(cols):
+            walls[col] |= UP
+            walls[(rows - 1) * cols + col] |= DOWN
+        for row in range(rows):
+            walls[row * cols] |= LEFT
+            walls[row * cols + cols - 1] |= RIGHT
+        return grid
+
+
+def solve(maze, start, end, solver=bfs, *options):
+    # one query on a TiledMaze: (path or None, tile stats for just that query)
+    maze.reset_stats()
+    started = time.perf_counter()
+    try:
+        path = solver(maze, start, end, *options)
+    except NoPathError:
+        path = None
+    report = maze.stats()
+    report['seconds'] = time.perf_counter() - started
+    return path, report
+
+
+def _header(rows, cols, tile_size, seed, start, end):
+    start = start if start is not None else (-1, -1)
+    end = end if end is not None else (-1, -1)
+    header = HEADER.pack(MAGIC, VERSION, 0, rows, cols, tile_size, -1 if seed is None else seed,
+                         start[0], start[1], end[0], end[1])
+    return header.ljust(HEADER_SIZE, b'\0')
+
+
+def _read_header(data):
+    if len(data) < HEADER_SIZE:
+        raise ValueError("Not a tiled maze file")
+    magic, version, _, rows, cols, tile_size, seed, start_row, start_col, end_row, end_col = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a tiled maze file")
+    if version > VERSION:
+        raise ValueError("Tiled maze file version %d is newer than this reader (%d)" % (version, VERSION))
+    start = (start_row, start_col) if start_row >= 0 else None
+    end = (end_row, end_col) if end_row >= 0 else None
+    return rows, cols, tile_size, (seed if seed >= 0 else None), start, end
+
+
+def _unpack_row(plane, cols):
+    return np.unpackbits(np.frombuffer(bytes(plane), dtype=np.uint8), bitorder='little')[:cols].astype(bool)
+
+
+def _grid_rows(grid):
+    rows, cols = grid.rows, grid.cols
+    size = grid.size
+    enemy = np.unpackbits(np.frombuffer(bytes(grid.enemy), dtype=np.uint8), bitorder='little')[:size]
+    reward = np.unpackbits(np.frombuffer(bytes(grid.reward), dtype=np.uint8), bitorder='little')[:size]
+    for row in range(rows):
+        cells = slice(row * cols, (row + 1) * cols)
+        yield (grid.walls[cells], np.packbits(enemy[cells], bitorder='little').tobytes(),
+               np.packbits(reward[cells], bitorder='little').tobytes())
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    from maze_solvers import astar
+    from maze_stream import eller_rows
+
+    rows = cols = 3000
+    with tempfile.TemporaryDirectory() as scratch:
+        file_name = os.path.join(scratch, 'maze.tiles')
+        started = time.perf_counter()
+        write_tiled(file_name, rows, cols, eller_rows(rows, cols, seed=1))
+        print("wrote %dx%d in %.1f s, %.1f MB" % (rows, cols, time.perf_counter() - started,
+                                                  os.path.getsize(file_name) / 1e6))
+        with TiledMaze(file_name, cache_tiles=128) as maze:
+            for name, solver in (('bfs', bfs), ('astar', astar)):
+                for start, end in (((0, 0), (rows - 1, cols - 1)), ((rows // 2, 0), (rows // 2, 200))):
+                    path, report = solve(maze, start, end, solver)
+                    print("%-6s %-12s -> %-12s length %-7s hit rate %.4f  misses %6d  read %7.1f MB  %.2f s"
+                          % (name, start, end, path and len(path) - 1, report['hit_rate'], report['misses'],
+                             report['bytes_read'] / 1e6, report['seconds']))